@@ -9,6 +9,7 @@
 
 import asyncio
 import logging
+import os
 import sys
 import time
 from pathlib import Path
@@ -17,13 +18,27 @@ from typing import Dict, List, Optional
 # 添加src目录到Python路径
 sys.path.insert(0, 'src')
 
-# 导入各个模块
-from crawler import WebCrawler, crawl_from_file
-from translator import HTMLTranslator, translate_html_file
-from link_localizer import LinkLocalizer
-from header_info_adder import HeaderInfoAdder
-from config.logging_config import setup_logging
-from config.settings import Config
+# 导入配置模块（各流程组件在用到时再导入，避免加载不需要的重量级依赖）
+from config.logging_config import setup_logging, ProgressLogger
+from config.settings import Config, config as default_config
+
+
+def _list_html(directory) -> List[os.DirEntry]:
+    """
+    列出目录下的HTML文件
+
+    使用os.scandir直接复用目录项信息，避免为每个文件构造Path对象
+
+    Args:
+        directory: 目录路径
+
+    Returns:
+        List[os.DirEntry]: HTML文件的目录项列表，目录不存在时返回空列表
+    """
+    if not os.path.isdir(directory):
+        return []
+    with os.scandir(directory) as it:
+        return [entry for entry in it if entry.is_file() and entry.name.endswith('.html')]
 
 
 class TranslationPipeline:
@@ -34,10 +49,12 @@ class TranslationPipeline:
         初始化翻译流水线
 
         Args:
-            config (Config): 配置对象，如果未提供则使用默认配置
+            config (Config): 配置对象，如果未提供则使用全局默认配置
         """
-        self.config = config or Config()
+        self.config = config or default_config
         self.logger = logging.getLogger(__name__)
+        # 逐文件循环中使用的日志方法
+        self._error = self.logger.error
 
         # 初始化各个组件
         self.crawler = None
@@ -59,26 +76,46 @@ class TranslationPipeline:
 
         self.logger.info("翻译流水线初始化完成")
 
-    async def initialize_components(self):
-        """初始化所有组件"""
+    async def initialize_components(self, components: Optional[List[str]] = None):
+        """
+        初始化流程组件，组件模块在此处按需导入
+
+        Args:
+            components (Optional[List[str]]): 需要初始化的组件名称
+                ('crawler', 'translator', 'link_localizer', 'header_adder')，默认全部初始化
+        """
+        if components is None:
+            components = ['crawler', 'translator', 'link_localizer', 'header_adder']
+
         try:
             self.logger.info("正在初始化各个组件...")
 
+            # 确保输出目录存在
+            self.config.ensure_dirs()
+
             # 初始化爬虫
-            self.crawler = WebCrawler()
-            self.logger.info("✅ 爬虫组件初始化完成")
+            if 'crawler' in components:
+                from crawler import WebCrawler
+                self.crawler = WebCrawler()
+                self.logger.info("✅ 爬虫组件初始化完成")
 
             # 初始化翻译器
-            self.translator = HTMLTranslator()
-            self.logger.info("✅ 翻译器组件初始化完成")
+            if 'translator' in components:
+                from translator import HTMLTranslator
+                self.translator = HTMLTranslator()
+                self.logger.info("✅ 翻译器组件初始化完成")
 
             # 初始化链接本地化器
-            self.link_localizer = LinkLocalizer()
-            self.logger.info("✅ 链接本地化器初始化完成")
+            if 'link_localizer' in components:
+                from link_localizer import LinkLocalizer
+                self.link_localizer = LinkLocalizer()
+                self.logger.info("✅ 链接本地化器初始化完成")
 
             # 初始化页头信息添加器
-            self.header_adder = HeaderInfoAdder()
-            self.logger.info("✅ 页头信息添加器初始化完成")
+            if 'header_adder' in components:
+                from header_info_adder import HeaderInfoAdder
+                self.header_adder = HeaderInfoAdder()
+                self.logger.info("✅ 页头信息添加器初始化完成")
 
             self.logger.info("🎉 所有组件初始化完成")
 
@@ -96,6 +133,8 @@ class TranslationPipeline:
         Returns:
             bool: 是否成功
         """
+        from crawler import crawl_from_file
+
         self.logger.info("=" * 60)
         self.logger.info("📡 步骤1：开始爬取网页内容")
         self.logger.info("=" * 60)
@@ -138,6 +177,8 @@ class TranslationPipeline:
         Returns:
             bool: 是否成功
         """
+        from translator import TranslationStatus, translate_html_file
+
         self.logger.info("=" * 60)
         self.logger.info("🌍 步骤2：开始翻译HTML页面")
         self.logger.info("=" * 60)
@@ -145,7 +186,7 @@ class TranslationPipeline:
         try:
             # 获取所有原始HTML文件
             origin_dir = Path(self.config.ORIGIN_DIR)
-            html_files = list(origin_dir.glob("*.html"))
+            html_files = _list_html(origin_dir)
 
             if not html_files:
                 self.logger.error(f"未找到原始HTML文件在目录: {origin_dir}")
@@ -153,39 +194,48 @@ class TranslationPipeline:
 
             self.logger.info(f"找到 {len(html_files)} 个HTML文件需要翻译")
 
+            # 预先筛掉已翻译的文件，避免为它们调度翻译任务
+            existing = {entry.name for entry in _list_html(self.config.TRANS_DIR)}
+            to_translate = [f for f in html_files if force_translate or f.name not in existing]
+
             success_count = 0
             failed_count = 0
-            skipped_count = 0
-
-            # 逐个翻译文件
-            for html_file in html_files:
-                try:
-                    self.logger.info(f"处理文件: {html_file.name}")
-
-                    # 使用translate_html_file函数，它会自动检查文件是否已存在
-                    result = await translate_html_file(str(html_file), force_translate)
-
-                    if result:
-                        # 检查是否是跳过的文件
-                        trans_dir = Path(self.config.TRANS_DIR)
-                        target_file = trans_dir / html_file.name
-                        if target_file.exists() and not force_translate:
-                            if "跳过已翻译文件" in str(result) or result == str(target_file):
-                                skipped_count += 1
-                                self.logger.info(f"⏭️  {html_file.name} 已存在，跳过翻译")
-                            else:
-                                success_count += 1
-                                self.logger.info(f"✅ {html_file.name} 翻译完成")
-                        else:
-                            success_count += 1
-                            self.logger.info(f"✅ {html_file.name} 翻译完成")
-                    else:
-                        failed_count += 1
-                        self.logger.error(f"❌ {html_file.name} 翻译失败")
-
-                except Exception as e:
+            skipped_count = len(html_files) - len(to_translate)
+
+            if skipped_count:
+                self.logger.info(f"⏭️  {skipped_count} 个文件已存在，跳过翻译")
+
+            # 并发翻译文件，使用信号量限制同时进行的API请求数量
+            semaphore = asyncio.Semaphore(self.config.BATCH_SIZE)
+            # 并发场景下按批输出进度，避免逐文件日志
+            progress = ProgressLogger(len(to_translate), "翻译进度", log_every=10)
+
+            async def _translate_one(html_file: os.DirEntry) -> 'TranslationStatus':
+                async with semaphore:
+                    # 所有文件共用步骤初始化时创建的翻译器
+                    result = await translate_html_file(
+                        html_file.path, force_translate, self.translator
+                    )
+                progress.update(1, html_file.name)
+                return result
+
+            results = await asyncio.gather(
+                *(_translate_one(html_file) for html_file in to_translate),
+                return_exceptions=True
+            )
+
+            for html_file, result in zip(to_translate, results):
+                if isinstance(result, Exception):
                     failed_count += 1
-                    self.logger.error(f"❌ {html_file.name} 翻译出错: {str(e)}")
+                    self._error(f"❌ {html_file.name} 翻译出错: {str(result)}")
+                elif result == TranslationStatus.SUCCESS:
+                    success_count += 1
+                elif result == TranslationStatus.SKIPPED:
+                    # 预筛选之后才被其他进程翻译完成的文件
+                    skipped_count += 1
+                else:
+                    failed_count += 1
+                    self._error(f"❌ {html_file.name} 翻译失败")
 
             self.stats['translate_success'] = success_count
             self.stats['translate_failed'] = failed_count
@@ -216,11 +266,8 @@ class TranslationPipeline:
         self.logger.info("=" * 60)
 
         try:
-            # 构建URL映射
-            self.link_localizer.build_url_mapping()
-
-            # 处理所有文件
-            stats = self.link_localizer.process_all_files()
+            # 处理所有文件（内部会构建URL映射），同步文件读写放到线程中执行，避免阻塞事件循环
+            stats = await asyncio.to_thread(self.link_localizer.process_all_files)
 
             self.stats['localize_links'] = stats.get('links_converted', 0)
 
@@ -246,8 +293,8 @@ class TranslationPipeline:
         self.logger.info("=" * 60)
 
         try:
-            # 处理所有文件
-            stats = self.header_adder.process_all_files()
+            # 处理所有文件，同步文件读写放到线程中执行，避免阻塞事件循环
+            stats = await asyncio.to_thread(self.header_adder.process_all_files)
 
             self.stats['add_headers'] = stats.get('headers_added', 0)
 
@@ -272,6 +319,7 @@ class TranslationPipeline:
             Dict: 流程统计信息
         """
         start_time = time.time()
+        completed = False
 
         self.logger.info("🚀 开始运行完整翻译流水线")
         self.logger.info("流程：爬虫 → 翻译 → 链接本地化 → 页头信息添加")
@@ -291,6 +339,7 @@ class TranslationPipeline:
                 return self.stats
 
             # 步骤3：本地化链接
+            # 注意：步骤3和步骤4会改写同一批翻译文件，必须顺序执行，并发执行会互相覆盖修改
             if not await self.step3_localize_links():
                 self.logger.error("❌ 链接本地化失败，终止流程")
                 return self.stats
@@ -300,18 +349,31 @@ class TranslationPipeline:
                 self.logger.error("❌ 页头信息添加失败，终止流程")
                 return self.stats
 
-            # 计算总耗时
-            self.stats['total_time'] = time.time() - start_time
-
-            # 显示最终统计
-            self.show_final_stats()
-
+            completed = True
             return self.stats
 
         except Exception as e:
             self.logger.error(f"流水线执行失败: {str(e)}")
             return self.stats
 
+        finally:
+            # 无论流程在哪一步结束（包括被取消），都记录耗时并释放资源
+            self.stats['total_time'] = time.time() - start_time
+            await self._cleanup()
+
+            # 显示最终统计（耗时已在上面计算）
+            if completed:
+                self.show_final_stats()
+
+    async def _cleanup(self):
+        """释放流水线持有的资源"""
+        if self.crawler is not None:
+            await self.crawler.aclose()
+
+        # 刷新日志输出，保证流程中途失败时日志完整
+        for handler in logging.getLogger().handlers:
+            handler.flush()
+
     def show_final_stats(self):
         """显示最终统计信息"""
         self.logger.info("=" * 80)
@@ -339,7 +401,7 @@ class TranslationPipeline:
         # 检查输出目录
         trans_dir = Path(self.config.TRANS_DIR)
         if trans_dir.exists():
-            html_files = list(trans_dir.glob("*.html"))
+            html_files = _list_html(trans_dir)
             self.logger.info(f"✨ 翻译完成的文件位于: {trans_dir}")
             self.logger.info(f"📁 共生成 {len(html_files)} 个翻译文件")
 
@@ -370,20 +432,31 @@ async def run_single_step(step: str, **kwargs) -> bool:
     Returns:
         bool: 是否成功
     """
-    pipeline = TranslationPipeline()
-    await pipeline.initialize_components()
-
-    if step == 'crawl':
-        return await pipeline.step1_crawl_pages(kwargs.get('urls_file', 'src/config/urls.txt'))
-    elif step == 'translate':
-        return await pipeline.step2_translate_pages()
-    elif step == 'localize':
-        return await pipeline.step3_localize_links()
-    elif step == 'headers':
-        return await pipeline.step4_add_headers()
-    else:
+    # 每个步骤只需要初始化（并导入）对应的组件
+    step_components = {
+        'crawl': ['crawler'],
+        'translate': ['translator'],
+        'localize': ['link_localizer'],
+        'headers': ['header_adder'],
+    }
+    if step not in step_components:
         raise ValueError(f"未知步骤: {step}")
 
+    pipeline = TranslationPipeline()
+    try:
+        await pipeline.initialize_components(step_components[step])
+
+        if step == 'crawl':
+            return await pipeline.step1_crawl_pages(kwargs.get('urls_file', 'src/config/urls.txt'))
+        elif step == 'translate':
+            return await pipeline.step2_translate_pages()
+        elif step == 'localize':
+            return await pipeline.step3_localize_links()
+        else:
+            return await pipeline.step4_add_headers()
+    finally:
+        await pipeline._cleanup()
+
 
 async def main():
     """主函数"""
@@ -423,4 +496,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # 未安装uvloop（如Windows平台）时使用默认事件循环
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
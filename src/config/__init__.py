@@ -17,6 +17,8 @@ from .settings import (
     USER_AGENT,
     REQUEST_DELAY,
     MAX_RETRIES,
+    HOST_RATE_LIMIT,
+    CRAWL_CACHE_TTL,
     TRANSLATOR_NAME,
     BATCH_SIZE
 )
@@ -39,6 +41,8 @@ __all__ = [
     'USER_AGENT',
     'REQUEST_DELAY',
     'MAX_RETRIES',
+    'HOST_RATE_LIMIT',
+    'CRAWL_CACHE_TTL',
     'TRANSLATOR_NAME',
     'BATCH_SIZE',
 
@@ -9,34 +9,42 @@
 import logging
 from typing import Optional
 
+# 日志级别名称到数值的映射
+_LEVELS = {name: getattr(logging, name) for name in ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')}
+
+# 控制台输出共用的格式化器
+_FORMATTER = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+
 class LoggingConfig:
     """日志配置管理类"""
 
     def __init__(self,
                  log_level: str = 'INFO'):
-        self.log_level = getattr(logging, log_level.upper())
+        self.log_level = _LEVELS[log_level.upper()]
         self._setup_logging()
 
     def _setup_logging(self):
-        """设置日志配置"""
+        """设置日志配置，重复调用时只更新日志级别"""
         # 创建根日志记录器
         root_logger = logging.getLogger()
         root_logger.setLevel(self.log_level)
 
+        # 已配置过则保留现有处理器
+        if getattr(root_logger, '_tp_configured', False):
+            for handler in root_logger.handlers:
+                handler.setLevel(self.log_level)
+            return
+
         # 清除现有的处理器
         for handler in root_logger.handlers[:]:
             root_logger.removeHandler(handler)
 
-        # 创建格式化器
-        console_formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s'
-        )
-
         # 控制台处理器
         console_handler = logging.StreamHandler()
         console_handler.setLevel(self.log_level)
-        console_handler.setFormatter(console_formatter)
+        console_handler.setFormatter(_FORMATTER)
         root_logger.addHandler(console_handler)
+        root_logger._tp_configured = True
 
         # 记录日志配置信息
         logging.info(f"日志系统初始化完成")
@@ -55,22 +63,28 @@ class LoggingConfig:
 class ProgressLogger:
     """进度日志记录器"""
 
-    def __init__(self, total_items: int, description: str = "Processing"):
+    def __init__(self, total_items: int, description: str = "Processing", log_every: int = 1):
         self.total_items = total_items
         self.current_item = 0
         self.description = description
+        # 每完成 log_every 项输出一次进度，最后一项总会输出
+        self.log_every = max(1, log_every)
         self.logger = logging.getLogger("progress")
+        self._info = self.logger.info
 
     def update(self, increment: int = 1, message: str = ""):
         """更新进度"""
         self.current_item += increment
+        if self.current_item % self.log_every != 0 and self.current_item < self.total_items:
+            return
+
         progress = (self.current_item / self.total_items) * 100
 
         log_message = f"{self.description}: {self.current_item}/{self.total_items} ({progress:.1f}%)"
         if message:
             log_message += f" - {message}"
 
-        self.logger.info(log_message)
+        self._info(log_message)
 
     def complete(self, message: str = "完成"):
         """标记完成"""
@@ -8,16 +8,32 @@
 
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 # 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent
 
 class Config:
-    """配置类，管理所有配置参数"""
+    """配置类，管理所有配置参数（单例，环境变量只在首次创建时读取）"""
 
-    def __init__(self):
-        self._load_from_env()
+    _instance: Optional['Config'] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance._dirs_ready = False
+            instance._dict_cache = None
+            instance._load_from_env()
+            cls._instance = instance
+        return cls._instance
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        # 修改配置项后，缓存的字典和已创建的目录都可能过期
+        if not name.startswith('_'):
+            super().__setattr__('_dict_cache', None)
+            if name in ('OUTPUT_DIR', 'ORIGIN_DIR', 'TRANS_DIR'):
+                super().__setattr__('_dirs_ready', False)
 
     def _load_from_env(self):
         """从环境变量加载配置"""
@@ -33,26 +49,35 @@ class Config:
         self.USER_AGENT = os.getenv('USER_AGENT', 'Mozilla/5.0 (compatible; TranslationBot/1.0)')
         self.REQUEST_DELAY = float(os.getenv('REQUEST_DELAY', '1.0'))
         self.MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
+        self.HOST_RATE_LIMIT = float(os.getenv('HOST_RATE_LIMIT', '5'))  # 每个主机每秒最多请求数
+        self.CRAWL_CACHE_TTL = float(os.getenv('CRAWL_CACHE_TTL', str(7 * 86400)))  # 抓取缓存有效期（秒）
 
         # 翻译配置
         self.TRANSLATOR_NAME = os.getenv('TRANSLATOR_NAME', '北极的树')
         self.BATCH_SIZE = int(os.getenv('BATCH_SIZE', '5'))
 
-        # 验证必需配置
-        self._validate_config()
+    def ensure_dirs(self):
+        """确保输出目录存在，同一进程内只创建一次"""
+        if self._dirs_ready:
+            return
 
-    def _validate_config(self):
-        """验证配置的有效性"""
-        # 确保目录存在
         for directory in [self.OUTPUT_DIR, self.ORIGIN_DIR, self.TRANS_DIR]:
             Path(directory).mkdir(parents=True, exist_ok=True)
 
+        self._dirs_ready = True
+
     def get_absolute_path(self, relative_path: str) -> Path:
         """获取相对于项目根目录的绝对路径"""
         return PROJECT_ROOT / relative_path
 
     def to_dict(self) -> Dict[str, Any]:
-        """将配置转换为字典格式"""
+        """将配置转换为字典格式（内部结果会被缓存，配置项修改后重建；返回副本，调用方可随意修改）"""
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return {section: dict(values) for section, values in self._dict_cache.items()}
+
+    def _build_dict(self) -> Dict[str, Any]:
+        """构建配置字典"""
         return {
             'paths': {
                 'output_dir': self.OUTPUT_DIR,
@@ -66,6 +91,8 @@ class Config:
                 'user_agent': self.USER_AGENT,
                 'request_delay': self.REQUEST_DELAY,
                 'max_retries': self.MAX_RETRIES,
+                'host_rate_limit': self.HOST_RATE_LIMIT,
+                'crawl_cache_ttl': self.CRAWL_CACHE_TTL,
             },
             'translation': {
                 'translator_name': self.TRANSLATOR_NAME,
@@ -84,5 +111,7 @@ LOG_LEVEL = config.LOG_LEVEL
 USER_AGENT = config.USER_AGENT
 REQUEST_DELAY = config.REQUEST_DELAY
 MAX_RETRIES = config.MAX_RETRIES
+HOST_RATE_LIMIT = config.HOST_RATE_LIMIT
+CRAWL_CACHE_TTL = config.CRAWL_CACHE_TTL
 TRANSLATOR_NAME = config.TRANSLATOR_NAME
 BATCH_SIZE = config.BATCH_SIZE
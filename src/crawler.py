@@ -7,20 +7,108 @@
 """
 
 import asyncio
+import concurrent.futures
+import hashlib
+import json
 import logging
+import os
+import random
 import time
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit
+from itertools import islice
+from typing import AsyncIterator, Iterator, List, Dict, Optional, Tuple
+from urllib.parse import urlparse, urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
 import re
 
+import aiofiles
 from crawl4ai import AsyncWebCrawler
 try:
     from bs4 import BeautifulSoup
 except ImportError:
     BeautifulSoup = None
 
-from config import OUTPUT_DIR, ORIGIN_DIR, USER_AGENT, REQUEST_DELAY, MAX_RETRIES
+# lxml可用时直接用它解析和序列化（比BeautifulSoup快得多）
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+from config import (
+    OUTPUT_DIR, ORIGIN_DIR, USER_AGENT, REQUEST_DELAY, MAX_RETRIES, HOST_RATE_LIMIT, CRAWL_CACHE_TTL
+)
+
+# URL转换使用的正则表达式（模块加载时编译一次）
+# HTML属性与CSS url()合并为一个模式，只需扫描一遍文档
+_URL_REWRITE_RE = re.compile(
+    r'(?P<attr>href|srcset|src|action|data)=(?P<q>["\'])(?P<val>[^"\']*?)(?P=q)'
+    r'|url\((?P<cq>["\']?)(?P<curl>[^)]*?)(?P=cq)\)',
+    re.IGNORECASE
+)
+_CSS_URL_RE = re.compile(r'url\((["\']?)([^)]*?)\1\)', re.IGNORECASE)
+
+# 无需转换的URL前缀：已是绝对URL、特殊协议、锚点和查询参数
+_ABS_PREFIXES = ('http://', 'https://', 'ftp://', 'mailto:', 'tel:', 'data:', 'javascript:')
+_SKIP_FIRST = ('#', '?')
+_SKIP_PREFIXES = _ABS_PREFIXES + _SKIP_FIRST
+
+# 文件名中允许保留的字符之外的部分（\w 与 str.isalnum 一样包含Unicode字母和数字）
+_FILENAME_SANITIZE_RE = re.compile(r'[^\w.-]+')
+
+# 可重试的异常类型；其余错误根据错误信息判断是否为永久性失败
+_RETRYABLE = (TimeoutError, ConnectionError, asyncio.TimeoutError)
+# 除408/429外的4xx状态码，以及DNS解析失败，重试没有意义。
+# 没有状态码字段时只认明确的"HTTP ... 404"/"status ... 404"写法，避免误判URL端口、耗时等数字
+_PERMANENT_ERROR_RE = re.compile(
+    r'(?:\bHTTP(?:/\d(?:\.\d)?)?(?:\s+error)?|\bstatus(?:[\s_]?code)?)[\s:=#]{1,10}(?!408\b|429\b)4\d\d\b'
+    r'|ERR_NAME_NOT_RESOLVED|Name or service not known|nodename nor servname',
+    re.IGNORECASE
+)
+_MAX_BACKOFF = 30.0
+
+# URL去重时忽略的跟踪参数
+_TRACKING_PARAMS = frozenset({'fbclid', 'gclid'})
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# 需要转换的标签属性映射
+_URL_ATTR_MAP = {
+    'a': ('href',),
+    'link': ('href',),
+    'script': ('src',),
+    'img': ('src', 'data-src', 'srcset'),
+    'source': ('src', 'srcset'),
+    'video': ('src', 'poster'),
+    'audio': ('src',),
+    'iframe': ('src',),
+    'embed': ('src',),
+    'object': ('data',),
+    'form': ('action',),
+    'base': ('href',),
+}
+
+
+class _TokenBucket:
+    """简单的异步令牌桶，限制单个主机的请求速率"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """获取一个令牌，令牌不足时等待"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
 
 
 class WebCrawler:
@@ -33,11 +121,79 @@ class WebCrawler:
         self.request_delay = REQUEST_DELAY
         self.max_retries = MAX_RETRIES
 
+        # 按主机限速，重试请求同样受限，避免触发服务端429
+        self.host_rate_limit = HOST_RATE_LIMIT
+        self._host_limiters: Dict[str, _TokenBucket] = {}
+
+        # 抓取缓存：记录成功抓取的页面信息，有效期内重复运行时跳过浏览器抓取
+        self.cache_dir = Path(OUTPUT_DIR) / ".crawl_cache"
+        self.cache_ttl = CRAWL_CACHE_TTL
+
+        # 浏览器实例在首次抓取时创建，并在所有页面之间复用
+        self._crawler: Optional[AsyncWebCrawler] = None
+        self._crawler_lock: Optional[asyncio.Lock] = None
+        self._context_depth = 0
+
+        # HTML转换是CPU密集型任务，放到进程池中执行，首次使用时创建
+        self._rewrite_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+        # 本进程内已分配的文件名 -> 对应URL的去重键，用于发现不同URL的同名冲突
+        self._claimed_filenames: Dict[str, str] = {}
+
         # 确保输出目录存在
         Path(ORIGIN_DIR).mkdir(parents=True, exist_ok=True)
 
         self.logger.info("网页爬取器初始化完成")
 
+    async def __aenter__(self) -> 'WebCrawler':
+        self._context_depth += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._context_depth -= 1
+        if self._context_depth == 0:
+            await self.aclose()
+
+    async def _get_crawler(self) -> AsyncWebCrawler:
+        """获取共享的浏览器实例，首次调用时启动"""
+        if self._crawler is None:
+            if self._crawler_lock is None:
+                self._crawler_lock = asyncio.Lock()
+
+            async with self._crawler_lock:
+                if self._crawler is None:
+                    crawler = AsyncWebCrawler(
+                        user_agent=self.user_agent,
+                        headless=True,
+                        verbose=True,
+                        browser_type="chromium",  # 使用Chromium以获得更好的JS支持
+                        always_by_pass_cache=True
+                    )
+                    await crawler.start()
+                    self._crawler = crawler
+
+        return self._crawler
+
+    async def aclose(self):
+        """关闭共享的浏览器实例和HTML转换进程池"""
+        if self._crawler is not None:
+            crawler, self._crawler = self._crawler, None
+            await crawler.close()
+
+        if self._rewrite_pool is not None:
+            pool, self._rewrite_pool = self._rewrite_pool, None
+            await asyncio.to_thread(pool.shutdown)
+
+    async def _rewrite_html(self, html_content: str, base_url: str) -> str:
+        """在进程池中将HTML的相对URL转换为绝对URL"""
+        if self._rewrite_pool is None:
+            self._rewrite_pool = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count())
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._rewrite_pool, convert_relative_to_absolute_urls, html_content, base_url
+        )
+
     async def fetch_dynamic_page_content(self, url: str, wait_time: float = 5.0, custom_js: List[str] = None) -> Optional[Dict]:
         """
         抓取动态内容页面，支持自定义等待时间和JS代码
@@ -61,150 +217,226 @@ class WebCrawler:
         # 合并自定义JS代码
         js_code = default_js + (custom_js or [])
 
-        async with AsyncWebCrawler(
-            user_agent=self.user_agent,
-            headless=True,
-            verbose=True,
-            browser_type="chromium",
-            always_by_pass_cache=True
-        ) as crawler:
-
-            for attempt in range(self.max_retries):
-                try:
-                    result = await crawler.arun(
-                        url=url,
-                        word_count_threshold=10,
-                        bypass_cache=True,
-                        process_iframes=True,
-                        remove_overlay_elements=True,
-                        exclude_external_links=False,
-                        exclude_external_images=False,
-                        wait_for="body",
-                        delay_before_return_html=wait_time,
-                        js_code=js_code,
-                        css_selector="body",
-                        simulate_user=True,
-                        override_navigator=True,
-                        page_timeout=60000  # 60秒超时
-                    )
-
-                    if result.success:
-                        page_data = {
-                            'url': url,
-                            'title': result.metadata.get('title', '') if result.metadata else '',
-                            'html': result.html,
-                            'links': getattr(result, 'links', []),
-                            'images': getattr(result, 'images', []),
-                            'metadata': result.metadata or {},
-                            'success': True,
-                            'timestamp': time.time(),
-                            'dynamic_content': True
-                        }
-
-                        # 转换相对URL为绝对URL并保存HTML
-                        converted_html = self.convert_relative_to_absolute_urls(result.html, url)
-                        await self._save_original_html(url, converted_html)
-
-                        self.logger.info(f"动态页面抓取成功: {url}")
-                        return page_data
-
-                    else:
-                        error_msg = f"动态页面抓取失败 (尝试 {attempt + 1}/{self.max_retries}): {result.error_message}"
-                        self.logger.warning(error_msg)
-
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.request_delay * (attempt + 1))
+        result = await self._arun_with_retry(
+            url,
+            "动态页面",
+            word_count_threshold=10,
+            bypass_cache=True,
+            process_iframes=True,
+            remove_overlay_elements=True,
+            exclude_external_links=False,
+            exclude_external_images=False,
+            wait_for="body",
+            delay_before_return_html=wait_time,
+            js_code=js_code,
+            css_selector="body",
+            simulate_user=True,
+            override_navigator=True,
+            page_timeout=60000  # 60秒超时
+        )
+
+        if result is None:
+            self.logger.error(f"动态页面抓取最终失败: {url}")
+            return None
 
-                except Exception as e:
-                    error_msg = f"动态页面抓取异常 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}"
-                    self.logger.error(error_msg)
+        page_data = {
+            'url': url,
+            'title': result.metadata.get('title', '') if result.metadata else '',
+            'html': result.html,
+            'links': getattr(result, 'links', []),
+            'images': getattr(result, 'images', []),
+            'metadata': result.metadata or {},
+            'success': True,
+            'timestamp': time.time(),
+            'dynamic_content': True
+        }
 
-                    if attempt < self.max_retries - 1:
-                        await asyncio.sleep(self.request_delay * (attempt + 1))
+        # 转换相对URL为绝对URL并保存HTML
+        converted_html = await self._rewrite_html(result.html, url)
+        await self._save_original_html(url, converted_html)
 
-            self.logger.error(f"动态页面抓取最终失败: {url}")
-            return None
+        self.logger.info(f"动态页面抓取成功: {url}")
+        return page_data
 
-    async def fetch_page_content(self, url: str) -> Optional[Dict]:
+    async def fetch_page_content(self, url: str, force_refresh: bool = False) -> Optional[Dict]:
         """
         抓取单个页面的内容
 
         Args:
             url (str): 要抓取的URL
+            force_refresh (bool): 是否忽略抓取缓存，强制重新抓取
 
         Returns:
-            Optional[Dict]: 包含页面内容的字典，失败时返回None
+            Optional[Dict]: 包含页面内容的字典，失败时返回None；命中缓存时'html'为已保存的HTML
         """
+        if not force_refresh:
+            cached = await self._load_cached_page(url)
+            if cached is not None:
+                self.logger.info(f"命中抓取缓存，跳过抓取: {url}")
+                return cached
+
         self.logger.info(f"开始抓取页面: {url}")
 
-        async with AsyncWebCrawler(
-            user_agent=self.user_agent,
-            headless=True,
-            verbose=True,
-            browser_type="chromium",  # 使用Chromium以获得更好的JS支持
-            always_by_pass_cache=True
-        ) as crawler:
-
-            for attempt in range(self.max_retries):
-                try:
-                    # 执行爬取
-                    result = await crawler.arun(
-                        url=url,
-                        word_count_threshold=10,
-                        bypass_cache=True,
-                        process_iframes=True,
-                        remove_overlay_elements=True,
-                        exclude_external_links=False,
-                        exclude_external_images=False,
-                        wait_for="body",  # 等待body元素加载
-                        delay_before_return_html=3.0,  # 等待3秒让JS执行
-                        js_code=[
-                            "window.scrollTo(0, document.body.scrollHeight);",  # 滚动到底部触发懒加载
-                            "await new Promise(resolve => setTimeout(resolve, 2000));"  # 额外等待2秒
-                        ],
-                        css_selector="body",  # 确保获取完整内容
-                        simulate_user=True,  # 模拟用户行为
-                        override_navigator=True  # 覆盖navigator检测
-                    )
+        # 执行爬取
+        result = await self._arun_with_retry(
+            url,
+            "",
+            word_count_threshold=10,
+            bypass_cache=True,
+            process_iframes=True,
+            remove_overlay_elements=True,
+            exclude_external_links=False,
+            exclude_external_images=False,
+            wait_for="body",  # 等待body元素加载
+            delay_before_return_html=3.0,  # 等待3秒让JS执行
+            js_code=[
+                "window.scrollTo(0, document.body.scrollHeight);",  # 滚动到底部触发懒加载
+                "await new Promise(resolve => setTimeout(resolve, 2000));"  # 额外等待2秒
+            ],
+            css_selector="body",  # 确保获取完整内容
+            simulate_user=True,  # 模拟用户行为
+            override_navigator=True  # 覆盖navigator检测
+        )
+
+        if result is None:
+            # 所有重试都失败
+            self.logger.error(f"页面抓取最终失败: {url}")
+            return None
 
-                    if result.success:
-                        # 提取页面信息
-                        page_data = {
-                            'url': url,
-                            'title': result.metadata.get('title', '') if result.metadata else '',
-                            'html': result.html,
-                            'links': getattr(result, 'links', []),
-                            'images': getattr(result, 'images', []),
-                            'metadata': result.metadata or {},
-                            'success': True,
-                            'timestamp': time.time()
-                        }
-
-                        # 转换相对URL为绝对URL并保存HTML
-                        converted_html = self.convert_relative_to_absolute_urls(result.html, url)
-                        await self._save_original_html(url, converted_html)
-
-                        self.logger.info(f"页面抓取成功: {url}")
-                        return page_data
+        # 提取页面信息
+        page_data = {
+            'url': url,
+            'title': result.metadata.get('title', '') if result.metadata else '',
+            'html': result.html,
+            'links': getattr(result, 'links', []),
+            'images': getattr(result, 'images', []),
+            'metadata': result.metadata or {},
+            'success': True,
+            'timestamp': time.time()
+        }
 
-                    else:
-                        error_msg = f"抓取失败 (尝试 {attempt + 1}/{self.max_retries}): {result.error_message}"
-                        self.logger.warning(error_msg)
+        # 转换相对URL为绝对URL并保存HTML
+        converted_html = await self._rewrite_html(result.html, url)
+        file_path = await self._save_original_html(url, converted_html)
+        await self._store_cache(url, page_data, file_path)
 
-                        if attempt < self.max_retries - 1:
-                            await asyncio.sleep(self.request_delay * (attempt + 1))  # 递增延时
+        self.logger.info(f"页面抓取成功: {url}")
+        return page_data
 
-                except Exception as e:
-                    error_msg = f"抓取异常 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}"
-                    self.logger.error(error_msg)
+    def _cache_path(self, url: str) -> Path:
+        """获取URL对应的缓存文件路径"""
+        key = hashlib.blake2b(_normalize_url(url).encode('utf-8'), digest_size=16).hexdigest()
+        return self.cache_dir / f"{key}.json"
 
-                    if attempt < self.max_retries - 1:
-                        await asyncio.sleep(self.request_delay * (attempt + 1))
+    def _load_cache(self, url: str) -> Optional[Dict]:
+        """读取未过期的抓取缓存，并从已保存的文件读回HTML；缓存的HTML文件已被删除时视为未命中"""
+        cache_path = self._cache_path(url)
+        try:
+            if time.time() - cache_path.stat().st_mtime >= self.cache_ttl:
+                return None
 
-            # 所有重试都失败
-            self.logger.error(f"页面抓取最终失败: {url}")
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                page_data = json.load(f)
+
+            with open(page_data.get('file_path', ''), 'r', encoding='utf-8') as f:
+                page_data['html'] = f.read()
+        except (OSError, ValueError):
             return None
 
+        page_data['cached'] = True
+        return page_data
+
+    async def _load_cached_page(self, url: str) -> Optional[Dict]:
+        """
+        读取抓取缓存，并把缓存文件的文件名登记为该URL所有
+
+        本进程内该文件名已被其他URL占用（其内容可能已被覆盖）时视为未命中，重新抓取。
+        """
+        cached = await asyncio.to_thread(self._load_cache, url)
+        if cached is None:
+            return None
+
+        key = _normalize_url(url)
+        if self._claimed_filenames.setdefault(Path(cached['file_path']).name, key) != key:
+            return None
+
+        return cached
+
+    async def _store_cache(self, url: str, page_data: Dict, file_path: str):
+        """写入抓取缓存（不含HTML正文，正文已保存在file_path）"""
+        entry = {key: value for key, value in page_data.items() if key != 'html'}
+        entry['file_path'] = file_path
+
+        cache_path = self._cache_path(url)
+        tmp_path = cache_path.with_suffix('.tmp')
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(tmp_path, 'w', encoding='utf-8') as f:
+                await f.write(json.dumps(entry, ensure_ascii=False, default=str))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            self.logger.warning(f"写入抓取缓存失败: {str(e)}")
+
+    async def _acquire_host_slot(self, url: str):
+        """等待目标主机的限速令牌"""
+        if self.host_rate_limit <= 0:
+            return
+
+        host = urlparse(url).netloc
+        limiter = self._host_limiters.get(host)
+        if limiter is None:
+            limiter = self._host_limiters[host] = _TokenBucket(self.host_rate_limit)
+        await limiter.acquire()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """计算带随机抖动的指数退避时间"""
+        return min(_MAX_BACKOFF, self.request_delay * (2 ** attempt)) * (1 + random.random() * 0.5)
+
+    async def _arun_with_retry(self, url: str, label: str, **run_kwargs):
+        """
+        执行抓取并在临时性错误时重试
+
+        Args:
+            url (str): 要抓取的URL
+            label (str): 日志中的页面类型前缀
+            **run_kwargs: 传给 AsyncWebCrawler.arun 的参数
+
+        Returns:
+            抓取成功时返回crawl4ai的结果对象，否则返回None
+        """
+        crawler = await self._get_crawler()
+
+        for attempt in range(self.max_retries):
+            try:
+                await self._acquire_host_slot(url)
+                result = await crawler.arun(url=url, **run_kwargs)
+
+                if result.success:
+                    return result
+
+                self.logger.warning(
+                    f"{label}抓取失败 (尝试 {attempt + 1}/{self.max_retries}): {result.error_message}"
+                )
+                # 有状态码时只按状态码判断，否则才从错误信息中识别
+                status_code = getattr(result, 'status_code', None)
+                if status_code:
+                    retryable = not (400 <= status_code < 500 and status_code not in (408, 429))
+                else:
+                    retryable = not _PERMANENT_ERROR_RE.search(result.error_message or '')
+
+            except Exception as e:
+                self.logger.error(f"{label}抓取异常 (尝试 {attempt + 1}/{self.max_retries}): {str(e)}")
+                retryable = isinstance(e, _RETRYABLE) or not _PERMANENT_ERROR_RE.search(str(e))
+
+            if not retryable:
+                self.logger.warning(f"{label}抓取遇到不可恢复的错误，停止重试: {url}")
+                break
+
+            if attempt < self.max_retries - 1:
+                await asyncio.sleep(self._backoff_delay(attempt))
+
+        return None
+
     async def _save_original_html(self, url: str, html_content: str) -> str:
         """
         保存原始HTML到文件
@@ -216,31 +448,12 @@ class WebCrawler:
         Returns:
             str: 保存的文件路径
         """
-        # 从URL生成文件名
-        parsed_url = urlparse(url)
-        filename = parsed_url.path.strip('/').split('/')[-1]
-        if not filename or filename == '':
-            filename = 'index'
-
-        # 确保文件名有.html扩展名
-        if not filename.endswith('.html'):
-            filename += '.html'
-
-        file_path = Path(ORIGIN_DIR) / filename
-
-        # 如果文件已存在，添加序号
-        counter = 1
-        original_filename = filename
-        while file_path.exists():
-            name, ext = original_filename.rsplit('.', 1)
-            filename = f"{name}_{counter}.{ext}"
-            file_path = Path(ORIGIN_DIR) / filename
-            counter += 1
+        file_path = Path(ORIGIN_DIR) / self._claim_filename(url)
 
         # 保存HTML内容
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+                await f.write(html_content)
 
             self.logger.info(f"原始HTML已保存: {file_path}")
             return str(file_path)
@@ -249,30 +462,95 @@ class WebCrawler:
             self.logger.error(f"保存HTML文件失败: {str(e)}")
             raise
 
-    async def batch_crawl(self, url_list: List[str]) -> List[Dict]:
+    def _claim_filename(self, url: str) -> str:
+        """
+        为URL分配保存用的文件名
+
+        同一URL总是得到同一个文件名（重新抓取会覆盖旧文件）。只有当另一个URL已占用
+        相同的文件名时，才追加URL哈希作为后缀，无需检查磁盘上的文件。
+        """
+        # 从URL生成文件名
+        filename = urlparse(url).path.strip('/').split('/')[-1] or 'index'
+
+        # 确保文件名有.html扩展名
+        if not filename.endswith('.html'):
+            filename += '.html'
+
+        key = _normalize_url(url)
+        owner = self._claimed_filenames.setdefault(filename, key)
+        if owner != key:
+            digest = hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+            filename = f"{filename[:-len('.html')]}-{digest}.html"
+            self._claimed_filenames[filename] = key
+
+        return filename
+
+    async def batch_crawl(self, url_list: List[str], concurrency: int = 8,
+                          force_refresh: bool = False) -> List[Dict]:
         """
         批量爬取多个URL
 
+        不同主机的URL并发抓取，同一主机的请求仍串行执行并保持request_delay间隔。
+
         Args:
             url_list (List[str]): URL列表
+            concurrency (int): 最大并发抓取数
+            force_refresh (bool): 是否忽略抓取缓存，强制重新抓取
 
         Returns:
-            List[Dict]: 爬取结果列表
+            List[Dict]: 爬取结果列表，顺序与去重后的url_list一致
         """
-        self.logger.info(f"开始批量爬取 {len(url_list)} 个页面")
+        unique_urls = dedupe_urls(url_list)
+        if len(unique_urls) < len(url_list):
+            self.logger.info(f"已跳过 {len(url_list) - len(unique_urls)} 个重复URL")
+        url_list = unique_urls
+
+        total = len(url_list)
+        self.logger.info(f"开始批量爬取 {total} 个页面 (并发数: {concurrency})")
+
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        host_locks: Dict[str, asyncio.Semaphore] = {}
+        visited_hosts = set()
+
+        async def _bounded_fetch(index: int, url: str) -> Optional[Dict]:
+            # 命中缓存时不占用主机锁，也不需要等待请求间隔
+            if not force_refresh:
+                cached = await self._load_cached_page(url)
+                if cached is not None:
+                    self.logger.info(f"进度: {index}/{total} - 命中抓取缓存: {url}")
+                    return cached
+
+            host = urlparse(url).netloc
+            host_lock = host_locks.setdefault(host, asyncio.Semaphore(1))
+            # 先占用主机锁再占用全局名额，避免同主机排队的任务占满并发数
+            async with host_lock:
+                async with semaphore:
+                    # 同一主机的后续请求保持请求间隔
+                    if host in visited_hosts:
+                        await asyncio.sleep(self.request_delay)
+                    visited_hosts.add(host)
+
+                    self.logger.info(f"进度: {index}/{total} - 正在处理: {url}")
+                    return await self.fetch_page_content(url, force_refresh=True)
+
+        try:
+            fetched = await asyncio.gather(
+                *(_bounded_fetch(i, url) for i, url in enumerate(url_list, 1)),
+                return_exceptions=True
+            )
+        finally:
+            # 在 async with 中使用时由上下文负责关闭
+            if self._context_depth == 0:
+                await self.aclose()
 
         results = []
         successful_count = 0
         failed_urls = []
 
-        for i, url in enumerate(url_list, 1):
-            self.logger.info(f"进度: {i}/{len(url_list)} - 正在处理: {url}")
-
-            # 添加请求间隔避免过于频繁
-            if i > 1:
-                await asyncio.sleep(self.request_delay)
-
-            result = await self.fetch_page_content(url)
+        for url, result in zip(url_list, fetched):
+            if isinstance(result, Exception):
+                self.logger.error(f"抓取异常: {url} - {str(result)}")
+                result = None
 
             if result:
                 results.append(result)
@@ -291,7 +569,7 @@ class WebCrawler:
 
         # 输出统计信息
         self.logger.info(f"批量爬取完成:")
-        self.logger.info(f"  总数: {len(url_list)}")
+        self.logger.info(f"  总数: {total}")
         self.logger.info(f"  成功: {successful_count}")
         self.logger.info(f"  失败: {len(failed_urls)}")
 
@@ -301,190 +579,264 @@ class WebCrawler:
         return results
 
     def convert_relative_to_absolute_urls(self, html_content: str, base_url: str) -> str:
+        """将HTML中的相对URL转换为绝对URL，见模块级函数 convert_relative_to_absolute_urls"""
+        return convert_relative_to_absolute_urls(html_content, base_url)
+
+    def get_filename_from_url(self, url: str) -> str:
         """
-        将HTML中的相对URL转换为绝对URL
+        从URL生成文件名
 
         Args:
-            html_content (str): HTML内容
-            base_url (str): 基础URL
+            url (str): URL地址
 
         Returns:
-            str: 转换后的HTML内容
+            str: 生成的文件名
         """
-        if not html_content:
-            return html_content
+        # 取最后一个非空部分作为文件名
+        path = urlparse(url).path
+        filename = next((part for part in reversed(path.split('/')) if part), 'index')
 
-        try:
-            # 如果有BeautifulSoup，使用它来解析HTML（更准确）
-            if BeautifulSoup:
-                return self._convert_with_bs4(html_content, base_url)
-            else:
-                # 降级到正则表达式方法
-                return self._convert_with_regex(html_content, base_url)
+        # 清理文件名中的特殊字符
+        filename = _FILENAME_SANITIZE_RE.sub('', filename)
 
-        except Exception as e:
-            self.logger.warning(f"URL转换失败，返回原始内容: {str(e)}")
-            return html_content
-
-    def _convert_with_bs4(self, html_content: str, base_url: str) -> str:
-        """使用BeautifulSoup进行URL转换"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # 需要转换的属性映射
-        url_attributes = {
-            'a': ['href'],
-            'link': ['href'],
-            'script': ['src'],
-            'img': ['src', 'data-src', 'srcset'],
-            'source': ['src', 'srcset'],
-            'video': ['src', 'poster'],
-            'audio': ['src'],
-            'iframe': ['src'],
-            'embed': ['src'],
-            'object': ['data'],
-            'form': ['action'],
-            'base': ['href']
-        }
+        return filename
 
-        for tag_name, attributes in url_attributes.items():
-            tags = soup.find_all(tag_name)
-            for tag in tags:
-                for attr in attributes:
-                    if tag.has_attr(attr):
-                        original_url = tag[attr]
-                        if original_url:
-                            if attr == 'srcset':
-                                # 处理srcset属性（可能包含多个URL）
-                                tag[attr] = self._convert_srcset(original_url, base_url)
-                            else:
-                                # 处理单个URL
-                                absolute_url = self._make_absolute_url(original_url, base_url)
-                                if absolute_url != original_url:
-                                    tag[attr] = absolute_url
+
+# URL转换是不依赖爬虫状态的纯函数，进程池工作进程直接调用，无需在子进程中创建WebCrawler
+def convert_relative_to_absolute_urls(html_content: str, base_url: str) -> str:
+    """
+    将HTML中的相对URL转换为绝对URL
+
+    Args:
+        html_content (str): HTML内容
+        base_url (str): 基础URL
+
+    Returns:
+        str: 转换后的HTML内容
+    """
+    if not html_content:
+        return html_content
+
+    try:
+        # 优先使用lxml，其次BeautifulSoup（均比正则表达式准确）
+        if lxml is not None:
+            return _convert_with_lxml(html_content, base_url)
+        elif BeautifulSoup:
+            return _convert_with_bs4(html_content, base_url)
+        else:
+            # 降级到正则表达式方法
+            return _convert_with_regex(html_content, base_url)
+
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"URL转换失败，返回原始内容: {str(e)}")
+        return html_content
+
+
+def _convert_with_lxml(html_content: str, base_url: str) -> str:
+    """使用lxml进行URL转换"""
+    tree = lxml.html.document_fromstring(html_content).getroottree()
+
+    for element in tree.iter():
+        tag = element.tag
+        # 跳过注释和处理指令
+        if not isinstance(tag, str):
+            continue
+
+        attributes = _URL_ATTR_MAP.get(tag)
+        if attributes:
+            for attr in attributes:
+                original_url = element.get(attr)
+                if original_url:
+                    if attr == 'srcset':
+                        # 处理srcset属性（可能包含多个URL）
+                        element.set(attr, _convert_srcset(original_url, base_url))
+                    else:
+                        # 处理单个URL
+                        absolute_url = _make_absolute_url(original_url, base_url)
+                        if absolute_url != original_url:
+                            element.set(attr, absolute_url)
+
+        # 处理内联style属性中的URL
+        style = element.get('style')
+        if style:
+            element.set('style', _convert_css_urls(style, base_url))
 
         # 处理CSS中的URL
-        style_tags = soup.find_all('style')
-        for style_tag in style_tags:
-            if style_tag.string:
-                style_tag.string = self._convert_css_urls(style_tag.string, base_url)
+        if tag == 'style' and element.text:
+            element.text = _convert_css_urls(element.text, base_url)
+
+    return lxml.html.tostring(tree, encoding='unicode')
+
+
+def _convert_with_bs4(html_content: str, base_url: str) -> str:
+    """使用BeautifulSoup进行URL转换"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # 一次遍历完成所有标签的属性转换
+    style_tags = []
+    for tag in soup.find_all(True):
+        attributes = _URL_ATTR_MAP.get(tag.name)
+        if attributes:
+            for attr in attributes:
+                original_url = tag.get(attr)
+                if original_url:
+                    if attr == 'srcset':
+                        # 处理srcset属性（可能包含多个URL）
+                        tag[attr] = _convert_srcset(original_url, base_url)
+                    else:
+                        # 处理单个URL
+                        absolute_url = _make_absolute_url(original_url, base_url)
+                        if absolute_url != original_url:
+                            tag[attr] = absolute_url
 
         # 处理内联style属性中的URL
-        tags_with_style = soup.find_all(attrs={'style': True})
-        for tag in tags_with_style:
-            tag['style'] = self._convert_css_urls(tag['style'], base_url)
-
-        return str(soup)
-
-    def _convert_with_regex(self, html_content: str, base_url: str) -> str:
-        """使用正则表达式进行URL转换（备用方法）"""
-        # 匹配常见的URL属性
-        patterns = [
-            (r'(href|src|action|data)=(["\'])([^"\']*?)\2', 3),
-            (r'(srcset)=(["\'])([^"\']*?)\2', 3),
-            (r'url\((["\']?)([^)]*?)\1\)', 2),  # CSS中的url()
-        ]
+        if tag.has_attr('style'):
+            tag['style'] = _convert_css_urls(tag['style'], base_url)
 
-        result = html_content
-        for pattern, url_group in patterns:
-            def replace_url(match):
-                full_match = match.group(0)
-                url = match.group(url_group)
+        if tag.name == 'style':
+            style_tags.append(tag)
 
-                if url_group == 3 and match.group(1) == 'srcset':
-                    # 处理srcset
-                    new_srcset = self._convert_srcset(url, base_url)
-                    return full_match.replace(url, new_srcset)
-                else:
-                    # 处理单个URL
-                    absolute_url = self._make_absolute_url(url, base_url)
-                    return full_match.replace(url, absolute_url)
-
-            result = re.sub(pattern, replace_url, result, flags=re.IGNORECASE)
-
-        return result
-
-    def _convert_srcset(self, srcset: str, base_url: str) -> str:
-        """转换srcset属性中的URL"""
-        if not srcset:
-            return srcset
-
-        # srcset格式: "url1 descriptor1, url2 descriptor2, ..."
-        parts = []
-        for item in srcset.split(','):
-            item = item.strip()
-            if item:
-                # 分离URL和描述符
-                url_parts = item.split()
-                if url_parts:
-                    url = url_parts[0]
-                    descriptor = ' '.join(url_parts[1:]) if len(url_parts) > 1 else ''
-
-                    absolute_url = self._make_absolute_url(url, base_url)
-                    if descriptor:
-                        parts.append(f"{absolute_url} {descriptor}")
-                    else:
-                        parts.append(absolute_url)
+    # 处理CSS中的URL（遍历结束后再替换内容，避免修改正在遍历的树）
+    for style_tag in style_tags:
+        if style_tag.string:
+            style_tag.string = _convert_css_urls(style_tag.string, base_url)
+
+    return str(soup)
 
-        return ', '.join(parts)
 
-    def _convert_css_urls(self, css_content: str, base_url: str) -> str:
-        """转换CSS内容中的URL"""
-        def replace_css_url(match):
-            quote = match.group(1) or ''
-            url = match.group(2)
-            absolute_url = self._make_absolute_url(url, base_url)
+def _convert_with_regex(html_content: str, base_url: str) -> str:
+    """使用正则表达式进行URL转换（备用方法）"""
+    def replace_url(match):
+        attr = match.group('attr')
+        if attr is None:
+            # CSS中的url()
+            quote = match.group('cq')
+            absolute_url = _make_absolute_url(match.group('curl'), base_url)
             return f"url({quote}{absolute_url}{quote})"
 
-        return re.sub(r'url\((["\']?)([^)]*?)\1\)', replace_css_url, css_content, flags=re.IGNORECASE)
+        quote = match.group('q')
+        value = match.group('val')
+        if attr.lower() == 'srcset':
+            new_value = _convert_srcset(value, base_url)
+        else:
+            new_value = _make_absolute_url(value, base_url)
+        return f"{attr}={quote}{new_value}{quote}"
+
+    return _URL_REWRITE_RE.sub(replace_url, html_content)
+
+
+def _convert_srcset(srcset: str, base_url: str) -> str:
+    """转换srcset属性中的URL"""
+    if not srcset:
+        return srcset
+
+    # srcset格式: "url1 descriptor1, url2 descriptor2, ..."
+    parts = []
+    for item in srcset.split(','):
+        item = item.strip()
+        if item:
+            # 分离URL和描述符
+            url_parts = item.split()
+            if url_parts:
+                url = url_parts[0]
+                descriptor = ' '.join(url_parts[1:]) if len(url_parts) > 1 else ''
+
+                absolute_url = _make_absolute_url(url, base_url)
+                if descriptor:
+                    parts.append(f"{absolute_url} {descriptor}")
+                else:
+                    parts.append(absolute_url)
 
-    def _make_absolute_url(self, url: str, base_url: str) -> str:
-        """将相对URL转换为绝对URL"""
-        if not url or not base_url:
-            return url
+    return ', '.join(parts)
 
-        # 跳过已经是绝对URL的情况
-        if url.startswith(('http://', 'https://', 'ftp://', 'mailto:', 'tel:', 'data:', 'javascript:')):
-            return url
 
-        # 跳过锚点链接和查询参数
-        if url.startswith(('#', '?')):
-            return url
+def _convert_css_urls(css_content: str, base_url: str) -> str:
+    """转换CSS内容中的URL"""
+    def replace_css_url(match):
+        quote = match.group(1) or ''
+        url = match.group(2)
+        absolute_url = _make_absolute_url(url, base_url)
+        return f"url({quote}{absolute_url}{quote})"
 
-        try:
-            # 使用urljoin进行URL合并
-            absolute_url = urljoin(base_url, url)
-            return absolute_url
-        except Exception as e:
-            self.logger.warning(f"URL转换失败 '{url}' with base '{base_url}': {str(e)}")
-            return url
+    return _CSS_URL_RE.sub(replace_css_url, css_content)
 
-    def get_filename_from_url(self, url: str) -> str:
-        """
-        从URL生成文件名
 
-        Args:
-            url (str): URL地址
+def _make_absolute_url(url: str, base_url: str) -> str:
+    """将相对URL转换为绝对URL"""
+    if not url or not base_url:
+        return url
 
-        Returns:
-            str: 生成的文件名
-        """
-        parsed_url = urlparse(url)
-        path_parts = parsed_url.path.strip('/').split('/')
+    # 跳过已经是绝对URL、锚点链接和查询参数的情况
+    if url.startswith(_SKIP_PREFIXES):
+        return url
 
-        # 取最后一个非空部分作为文件名
-        filename = None
-        for part in reversed(path_parts):
-            if part:
-                filename = part
-                break
+    try:
+        # 使用urljoin进行URL合并
+        absolute_url = urljoin(base_url, url)
+        return absolute_url
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"URL转换失败 '{url}' with base '{base_url}': {str(e)}")
+        return url
 
-        if not filename:
-            filename = 'index'
 
-        # 清理文件名中的特殊字符
-        filename = "".join(c for c in filename if c.isalnum() or c in ('-', '_', '.'))
+def _normalize_url(url: str) -> str:
+    """
+    规范化URL，仅用作去重的键
 
-        return filename
+    协议和主机名转小写，去掉默认端口、末尾斜杠、锚点以及utm_*等跟踪参数。
+    实际抓取仍使用原始URL，末尾斜杠会影响相对链接的解析。
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    netloc = parts.netloc.lower()
+
+    if parts.port and parts.port == _DEFAULT_PORTS.get(scheme):
+        netloc = netloc.rsplit(':', 1)[0]
+
+    query = parts.query
+    if query:
+        query = urlencode([
+            (key, value) for key, value in parse_qsl(query, keep_blank_values=True)
+            if not key.startswith('utm_') and key not in _TRACKING_PARAMS
+        ])
+
+    return urlunsplit((scheme, netloc, parts.path.rstrip('/'), query, ''))
+
+
+def dedupe_urls(urls: List[str]) -> List[str]:
+    """按规范化后的URL去重，保留首次出现的原始URL及其顺序"""
+    seen = set()
+    unique = []
+    for url in urls:
+        key = _normalize_url(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+
+def iter_urls_from_file(file_path: str) -> Iterator[str]:
+    """
+    逐行读取URL文件，跳过空行、注释行和重复URL
+
+    Args:
+        file_path (str): URL文件路径
+
+    Yields:
+        str: URL
+    """
+    seen = set()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            # 跳过空行和注释行
+            if not line or line.startswith('#'):
+                continue
+
+            key = _normalize_url(line)
+            if key not in seen:
+                seen.add(key)
+                yield line
 
 
 def load_urls_from_file(file_path: str) -> List[str]:
@@ -497,15 +849,8 @@ def load_urls_from_file(file_path: str) -> List[str]:
     Returns:
         List[str]: URL列表
     """
-    urls = []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                # 跳过空行和注释行
-                if line and not line.startswith('#'):
-                    urls.append(line)
-
+        urls = list(iter_urls_from_file(file_path))
         logging.getLogger(__name__).info(f"从 {file_path} 加载了 {len(urls)} 个URL")
         return urls
 
@@ -520,14 +865,14 @@ def load_urls_from_file(file_path: str) -> List[str]:
 # 便捷函数
 async def crawl_single_page(url: str) -> Optional[Dict]:
     """便捷函数：爬取单个页面"""
-    crawler = WebCrawler()
-    return await crawler.fetch_page_content(url)
+    async with WebCrawler() as crawler:
+        return await crawler.fetch_page_content(url)
 
 
-async def crawl_multiple_pages(url_list: List[str]) -> List[Dict]:
+async def crawl_multiple_pages(url_list: List[str], concurrency: int = 8) -> List[Dict]:
     """便捷函数：批量爬取多个页面"""
     crawler = WebCrawler()
-    return await crawler.batch_crawl(url_list)
+    return await crawler.batch_crawl(url_list, concurrency=concurrency)
 
 
 async def crawl_from_file(file_path: str) -> List[Dict]:
@@ -540,33 +885,50 @@ async def crawl_from_file(file_path: str) -> List[Dict]:
     return await crawler.batch_crawl(urls)
 
 
+async def crawl_from_file_streaming(file_path: str, batch_size: int = 64,
+                                   concurrency: int = 8) -> AsyncIterator[List[Dict]]:
+    """
+    便捷函数：分批读取URL文件并爬取，每完成一批就产出该批结果
+
+    URL文件按需读取，内存占用与批大小而非URL总数相关；调用方可以在批次之间保存进度。
+    """
+    urls = iter_urls_from_file(file_path)
+
+    async with WebCrawler() as crawler:
+        while True:
+            batch = list(islice(urls, batch_size))
+            if not batch:
+                break
+            yield await crawler.batch_crawl(batch, concurrency=concurrency)
+
+
 async def crawl_dynamic_page(url: str, wait_time: float = 5.0, custom_js: List[str] = None) -> Optional[Dict]:
     """便捷函数：爬取动态内容页面"""
-    crawler = WebCrawler()
-    return await crawler.fetch_dynamic_page_content(url, wait_time, custom_js)
+    async with WebCrawler() as crawler:
+        return await crawler.fetch_dynamic_page_content(url, wait_time, custom_js)
 
 
 async def crawl_dynamic_pages(url_list: List[str], wait_time: float = 5.0) -> List[Dict]:
     """便捷函数：批量爬取动态内容页面"""
-    crawler = WebCrawler()
-    results = []
+    async with WebCrawler() as crawler:
+        results = []
 
-    for url in url_list:
-        result = await crawler.fetch_dynamic_page_content(url, wait_time)
-        if result:
-            results.append(result)
-        else:
-            results.append({
-                'url': url,
-                'success': False,
-                'error': 'Failed to fetch dynamic content',
-                'timestamp': time.time()
-            })
+        for url in url_list:
+            result = await crawler.fetch_dynamic_page_content(url, wait_time)
+            if result:
+                results.append(result)
+            else:
+                results.append({
+                    'url': url,
+                    'success': False,
+                    'error': 'Failed to fetch dynamic content',
+                    'timestamp': time.time()
+                })
 
-        # 添加延时
-        await asyncio.sleep(crawler.request_delay)
+            # 添加延时
+            await asyncio.sleep(crawler.request_delay)
 
-    return results
+        return results
 
 
 
@@ -607,6 +969,36 @@ async def test_dynamic_page():
         print(f"❌ 动态页面爬取失败: {test_url}")
 
 
+async def test_cache_hit():
+    """测试抓取缓存命中：返回已保存的HTML，并登记文件名"""
+    print("\n=== 测试抓取缓存命中 ===")
+
+    import tempfile
+
+    url = "https://jax-ml.github.io/scaling-book/cache-test/"
+    html = "<html><body>cached</body></html>"
+    crawler = WebCrawler()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        crawler.cache_dir = Path(tmp_dir)
+        file_path = Path(tmp_dir) / "cache-test.html"
+        file_path.write_text(html, encoding='utf-8')
+        await crawler._store_cache(url, {'url': url, 'html': html, 'success': True}, str(file_path))
+
+        result = await crawler.fetch_page_content(url)
+        # 同名的另一个URL应分配到带哈希后缀的文件名
+        other_filename = crawler._claim_filename("https://example.com/cache-test/")
+
+    if not result or not result.get('cached'):
+        print("❌ 未命中抓取缓存")
+    elif result.get('html') != html:
+        print("❌ 缓存命中时未返回已保存的HTML")
+    elif other_filename == file_path.name:
+        print("❌ 缓存命中时未登记文件名")
+    else:
+        print(f"✅ 命中抓取缓存: {url}")
+
+
 async def main():
     """主测试函数"""
     # 导入日志配置
@@ -617,6 +1009,8 @@ async def main():
 
     print("开始测试网页爬取功能...\n")
 
+    await test_cache_hit()
+
     # 测试动态页面爬取
     #await test_dynamic_page()
 
@@ -634,5 +1028,10 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # 未安装uvloop（如Windows平台）时使用默认事件循环
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
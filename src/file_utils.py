@@ -0,0 +1,164 @@
+"""
+文件工具模块
+提供各处理步骤共用的文件读写辅助函数
+
+创建时间：2024-12-19
+项目：系列技术文章翻译
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+PathLike = Union[str, Path]
+
+
+def mtime_cache_key(*paths: PathLike) -> Optional[List[Any]]:
+    """
+    根据若干文件/目录的路径和修改时间生成缓存键
+
+    目录的修改时间只在其中增删或重命名文件时变化，正好对应文件列表的变化。
+
+    Args:
+        *paths: 参与计算的文件或目录路径
+
+    Returns:
+        Optional[List[Any]]: 缓存键，任一路径不存在时返回None
+    """
+    key: List[Any] = []
+    for path in paths:
+        try:
+            key.extend([str(Path(path).resolve()), os.stat(path).st_mtime_ns])
+        except OSError:
+            return None
+    return key
+
+
+def names_cache_key(names: Iterable[str]) -> str:
+    """
+    根据一组文件名生成缓存键，与顺序无关
+
+    与目录的修改时间不同，原地改写目录中的文件（临时文件+替换）不会改变它。
+
+    Args:
+        names: 文件名
+
+    Returns:
+        str: 文件名集合的摘要
+    """
+    joined = "\n".join(sorted(names))
+    return hashlib.blake2b(joined.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def load_json_cache(cache_path: PathLike, key: Optional[List[Any]]) -> Optional[Dict[str, Any]]:
+    """
+    读取缓存数据，缓存键不一致或缓存损坏时返回None
+
+    Args:
+        cache_path: 缓存文件路径
+        key: 期望的缓存键
+
+    Returns:
+        Optional[Dict[str, Any]]: 缓存的数据
+    """
+    if key is None:
+        return None
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cached, dict) or cached.get('key') != key:
+        return None
+    return cached.get('data')
+
+
+def save_json_cache(cache_path: PathLike, key: Optional[List[Any]], data: Dict[str, Any]) -> bool:
+    """
+    原子地写入缓存数据（先写临时文件再替换），写入失败时返回False
+
+    Args:
+        cache_path: 缓存文件路径
+        key: 缓存键
+        data: 要缓存的数据
+
+    Returns:
+        bool: 是否写入成功
+    """
+    if key is None:
+        return False
+
+    cache_path = Path(cache_path)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'data': data}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def mmap_file(path: PathLike) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    以只读内存映射方式打开文件，供子串预筛选和按需读取字节使用
+
+    空文件无法建立映射，此时直接返回空字节串（同样支持find和切片）。
+
+    Args:
+        path: 文件路径
+
+    Yields:
+        Union[mmap.mmap, bytes]: 文件内容的只读映射
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def iter_html_files(directory: PathLike) -> Iterator[os.DirEntry]:
+    """逐个产出目录中的HTML文件，调用方可以边列目录边处理（目录项自带文件类型，无需逐个 stat）"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith('.html') and entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+def scan_html_files(directory: PathLike) -> List[os.DirEntry]:
+    """列出目录中的HTML文件"""
+    return list(iter_html_files(directory))
+
+
+def atomic_write(path: PathLike, data: Union[str, bytes]) -> None:
+    """
+    原子地写入文件：先写同目录下的临时文件再替换，并发读取方不会看到写了一半的文件
+
+    Args:
+        path: 目标文件路径
+        data: 要写入的内容，str按UTF-8编码写入
+    """
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, 'wb', buffering=1 << 20) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
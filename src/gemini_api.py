@@ -1,11 +1,58 @@
 import os
+import sys
+import asyncio
+import hashlib
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
 from dotenv import load_dotenv
 from google import genai  # 使用新的导入方式
 from google.genai import types
 
+# orjson可用时用它解析原始JSON响应，否则退回标准库json
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+# 加载环境变量（模块导入时执行一次）
+load_dotenv()
+
+# 显示流式生成进度时，每输出多少个文本块刷新一次标准输出
+_FLUSH_EVERY = 8
+
+
+class _StreamCollector:
+    """拼接流式输出的文本块，可选择实时打印；同步和异步的流式接口共用"""
+
+    def __init__(self, show_progress):
+        self.show_progress = show_progress
+        self.parts = []
+        self._write = sys.stdout.write
+
+    def add(self, chunk_text):
+        """追加一个文本块"""
+        self.parts.append(chunk_text)
+        if self.show_progress:
+            self._write(chunk_text)
+            # 每隔若干块刷新一次输出，减少系统调用
+            if len(self.parts) % _FLUSH_EVERY == 0:
+                sys.stdout.flush()
+
+    def finish(self):
+        """结束输出并返回完整的文本"""
+        if self.show_progress:
+            self._write("\n")  # 换行
+            sys.stdout.flush()
+        return ''.join(self.parts)
+
+
 class GeminiAPI:
     """Google Gemini API封装，使用Google Gen AI SDK"""
 
+    # 按 (api_key, base_url) 共享客户端，多个实例复用同一个HTTP连接池
+    _client_cache: Dict[Tuple[str, str], genai.Client] = {}
+
     def __init__(self, api_key=None):
         """
         初始化Google Gemini API
@@ -13,9 +60,6 @@ class GeminiAPI:
         Args:
             api_key (str, optional): API密钥，如果为None则从环境变量中读取
         """
-        # 加载环境变量
-        load_dotenv()
-
         # 从环境变量或参数获取API密钥
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
         if not self.api_key:
@@ -25,6 +69,11 @@ class GeminiAPI:
         self.model_name = os.getenv('GEMINI_MODEL_NAME', "gemini-2.5-pro")
         self.temperature = 0.7  # 默认温度参数
 
+        # 响应缓存目录：相同的模型、温度、响应结构和提示词直接复用上次的结果
+        self._cache_dir = Path(os.getenv('GEMINI_CACHE_DIR', '.gemini_cache'))
+        # 缓存有效期（秒），超过后重新请求；0表示永不过期
+        self._cache_ttl = float(os.getenv('GEMINI_CACHE_TTL', str(24 * 3600)))
+
         # 设置API选项并初始化客户端
         self._configure_gemini_api()
 
@@ -33,20 +82,77 @@ class GeminiAPI:
         """配置Google Gemini API客户端"""
         # 创建客户端实例
         proxy_url = os.getenv('GEMINI_BASE_URL')
-        self.client = genai.Client(api_key=self.api_key, http_options=types.HttpOptions(api_version='v1beta', base_url=proxy_url, timeout=2400000))
+        key = (self.api_key, proxy_url or '')
+
+        client = GeminiAPI._client_cache.get(key)
+        if client is None:
+            client = genai.Client(api_key=self.api_key, http_options=types.HttpOptions(api_version='v1beta', base_url=proxy_url, timeout=2400000))
+            GeminiAPI._client_cache[key] = client
+            print(f"已初始化Gemini API客户端，使用模型: {self.model_name}")
+
+        self.client = client
 
-        print(f"已初始化Gemini API客户端，使用模型: {self.model_name}")
+    def _cache_key(self, prompt, schema=None):
+        """根据模型、温度、响应结构和提示词生成缓存键"""
+        schema_name = schema.__name__ if schema else ''
+        raw = f"{self.model_name}|{self.temperature}|{schema_name}|{prompt}"
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
 
-    def generate_text(self, prompt):
+    def _read_cache(self, key, suffix):
+        """读取缓存内容，不存在或已过期时返回None"""
+        cache_path = self._cache_dir / f"{key}{suffix}"
+        try:
+            if self._cache_ttl > 0 and time.time() - cache_path.stat().st_mtime > self._cache_ttl:
+                return None
+            return cache_path.read_text(encoding='utf-8')
+        except OSError:
+            return None
+
+    def _write_cache(self, key, suffix, text):
+        """原子地写入缓存，写入失败不影响本次调用结果；空响应不缓存"""
+        if not text:
+            return
+        cache_path = self._cache_dir / f"{key}{suffix}"
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(text, encoding='utf-8')
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"写入Gemini响应缓存失败: {str(e)}")
+
+    @staticmethod
+    def _report_usage(usage):
+        """输出请求的输入token数及其中命中隐式上下文缓存的部分，用于确认提示词前缀缓存是否生效"""
+        if usage is None:
+            return
+        prompt_tokens = getattr(usage, 'prompt_token_count', None) or 0
+        cached_tokens = getattr(usage, 'cached_content_token_count', None) or 0
+        print(f"Gemini输入token: {prompt_tokens}，命中隐式缓存: {cached_tokens}")
+
+    def generate_text(self, prompt, use_cache=True):
         """
         使用Gemini API生成文本
 
         Args:
             prompt (str): 提示词
+            use_cache (bool): 是否读取响应缓存；为False时重新生成并刷新缓存
 
         Returns:
             str: 生成的文本
         """
+        key = self._cache_key(prompt)
+        if use_cache:
+            cached = self._read_cache(key, '.txt')
+            if cached is not None:
+                return cached
+
+        text = self._generate_text_uncached(prompt)
+        self._write_cache(key, '.txt', text)
+        return text
+
+    def _generate_text_uncached(self, prompt):
+        """调用Gemini API生成文本"""
         try:
             # 使用新的SDK调用方式
             response = self.client.models.generate_content(
@@ -54,6 +160,7 @@ class GeminiAPI:
                 contents=prompt,
                 config=types.GenerateContentConfig(temperature= self.temperature)
             )
+            self._report_usage(getattr(response, 'usage_metadata', None))
 
             # 提取并返回生成的文本
             if hasattr(response, 'text'):
@@ -67,17 +174,72 @@ class GeminiAPI:
             raise RuntimeError(f"Gemini API调用失败: {str(e)}")
 
 
-    def generate_structured_content(self, prompt, response_schema):
+    async def agenerate_text(self, prompt, use_cache=True):
+        """
+        generate_text的异步版本，在线程中执行阻塞的API调用
+
+        Args:
+            prompt (str): 提示词
+            use_cache (bool): 是否读取响应缓存
+
+        Returns:
+            str: 生成的文本
+        """
+        return await asyncio.to_thread(self.generate_text, prompt, use_cache)
+
+    async def generate_batch(self, prompts: List[str], concurrency: int = 8) -> List:
+        """
+        并发生成多个提示词的文本
+
+        Args:
+            prompts (List[str]): 提示词列表
+            concurrency (int): 最大并发请求数，应按模型的速率限制设置
+
+        Returns:
+            List: 与prompts顺序一致的结果列表，失败的项为对应的异常对象
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _one(prompt):
+            async with semaphore:
+                return await self.agenerate_text(prompt)
+
+        return await asyncio.gather(*(_one(p) for p in prompts), return_exceptions=True)
+
+    def generate_structured_content(self, prompt, response_schema, use_cache=True):
         """
         使用Gemini API生成结构化内容
 
         Args:
             prompt (str): 提示词
             response_schema: Pydantic模型类，用于定义响应结构
+            use_cache (bool): 是否读取响应缓存；为False时重新生成并刷新缓存
 
         Returns:
             解析后的结构化对象
         """
+        # 缓存原始JSON文本，命中缓存时仍会重新校验，校验失败的缓存视为未命中
+        key = self._cache_key(prompt, response_schema)
+        if use_cache:
+            cached = self._read_cache(key, '.json')
+            if cached is not None:
+                try:
+                    return response_schema.model_validate_json(cached)
+                except Exception:
+                    pass
+
+        json_text = self._generate_structured_json(prompt, response_schema)
+        try:
+            result = response_schema.model_validate_json(json_text)
+        except Exception as e:
+            raise RuntimeError(f"Gemini结构化输出API调用失败: {str(e)}")
+
+        # 只缓存校验通过的响应，截断或无效的JSON不会在之后的运行中被反复读出
+        self._write_cache(key, '.json', json_text)
+        return result
+
+    def _generate_structured_json(self, prompt, response_schema):
+        """调用Gemini API生成结构化内容，返回未解析的JSON文本"""
         try:
             # 使用结构化输出配置
             response = self.client.models.generate_content(
@@ -89,6 +251,7 @@ class GeminiAPI:
                     response_schema=response_schema,
                 )
             )
+            self._report_usage(getattr(response, 'usage_metadata', None))
 
             # 提取文本内容
             if hasattr(response, 'text'):
@@ -98,12 +261,25 @@ class GeminiAPI:
             else:
                 raise RuntimeError("API响应格式异常，无法提取生成的文本")
 
-            # 解析为结构化对象
-            return response_schema.model_validate_json(json_text)
+            return json_text
 
         except Exception as e:
             raise RuntimeError(f"Gemini结构化输出API调用失败: {str(e)}")
 
+    async def agenerate_structured_content(self, prompt, response_schema, use_cache=True):
+        """
+        generate_structured_content的异步版本，在线程中执行阻塞的API调用
+
+        Args:
+            prompt (str): 提示词
+            response_schema: Pydantic模型类，用于定义响应结构
+            use_cache (bool): 是否读取响应缓存
+
+        Returns:
+            解析后的结构化对象
+        """
+        return await asyncio.to_thread(self.generate_structured_content, prompt, response_schema, use_cache)
+
     def generate_content_stream(self, prompt):
         """
         使用Gemini API生成流式文本输出
@@ -122,8 +298,10 @@ class GeminiAPI:
                 config=types.GenerateContentConfig(temperature=self.temperature)
             )
 
-            # 流式输出每个chunk
+            # 流式输出每个chunk，用量信息随最后的chunk返回
+            usage = None
             for chunk in response:
+                usage = getattr(chunk, 'usage_metadata', None) or usage
                 if hasattr(chunk, 'text') and chunk.text:
                     yield chunk.text
                 elif hasattr(chunk, 'parts'):
@@ -131,31 +309,58 @@ class GeminiAPI:
                         if hasattr(part, 'text') and part.text:
                             yield part.text
 
+            self._report_usage(usage)
+
         except Exception as e:
             raise RuntimeError(f"Gemini流式API调用失败: {str(e)}")
 
-    def generate_text_with_stream(self, prompt, show_progress=True):
+    @staticmethod
+    def _collect_stream(chunks, show_progress):
+        """
+        拼接流式输出的文本块，可选择实时打印
+
+        Args:
+            chunks: 文本块迭代器
+            show_progress (bool): 是否显示生成进度
+
+        Returns:
+            str: 完整的文本
+        """
+        collector = _StreamCollector(show_progress)
+        for chunk_text in chunks:
+            collector.add(chunk_text)
+        return collector.finish()
+
+    @staticmethod
+    async def _acollect_stream(chunks, show_progress):
+        """_collect_stream的异步版本，文本块到达时即在事件循环中拼接"""
+        collector = _StreamCollector(show_progress)
+        async for chunk_text in chunks:
+            collector.add(chunk_text)
+        return collector.finish()
+
+    def generate_text_with_stream(self, prompt, show_progress=True, use_cache=True):
         """
         使用流式输出生成完整文本，可选择显示进度
 
         Args:
             prompt (str): 提示词
             show_progress (bool): 是否显示生成进度
+            use_cache (bool): 是否读取响应缓存；为False时重新生成并刷新缓存
 
         Returns:
             str: 完整的生成文本
         """
-        try:
-            full_text = ""
+        key = self._cache_key(prompt)
+        if use_cache:
+            cached = self._read_cache(key, '.txt')
+            if cached is not None:
+                return cached
 
-            for chunk_text in self.generate_content_stream(prompt):
-                full_text += chunk_text
-                if show_progress:
-                    print(chunk_text, end="", flush=True)
-
-            if show_progress:
-                print()  # 换行
+        try:
+            full_text = self._collect_stream(self.generate_content_stream(prompt), show_progress)
 
+            self._write_cache(key, '.txt', full_text)
             return full_text
 
         except Exception as e:
@@ -184,8 +389,10 @@ class GeminiAPI:
                 )
             )
 
-            # 流式输出每个chunk
+            # 流式输出每个chunk，用量信息随最后的chunk返回
+            usage = None
             for chunk in response:
+                usage = getattr(chunk, 'usage_metadata', None) or usage
                 if hasattr(chunk, 'text') and chunk.text:
                     yield chunk.text
                 elif hasattr(chunk, 'parts'):
@@ -193,10 +400,12 @@ class GeminiAPI:
                         if hasattr(part, 'text') and part.text:
                             yield part.text
 
+            self._report_usage(usage)
+
         except Exception as e:
             raise RuntimeError(f"Gemini流式结构化输出API调用失败: {str(e)}")
 
-    def generate_structured_content_with_stream(self, prompt, response_schema, show_progress=True):
+    def generate_structured_content_with_stream(self, prompt, response_schema, show_progress=True, use_cache=True):
         """
         使用流式输出生成完整结构化内容，可选择显示进度
 
@@ -204,23 +413,117 @@ class GeminiAPI:
             prompt (str): 提示词
             response_schema: Pydantic模型类，用于定义响应结构
             show_progress (bool): 是否显示生成进度
+            use_cache (bool): 是否读取响应缓存；为False时重新生成并刷新缓存
 
         Returns:
             解析后的结构化对象
         """
+        key = self._cache_key(prompt, response_schema)
+        if use_cache:
+            cached = self._read_cache(key, '.json')
+            if cached is not None:
+                # 校验失败的缓存视为未命中，重新生成
+                try:
+                    return response_schema.model_validate_json(cached)
+                except Exception:
+                    pass
+
         try:
-            full_json_text = ""
+            full_json_text = self._collect_stream(
+                self.generate_structured_content_stream(prompt, response_schema), show_progress
+            )
+
+            # 解析为结构化对象，成功后才写入缓存
+            result = response_schema.model_validate_json(full_json_text)
+            self._write_cache(key, '.json', full_json_text)
+            return result
+
+        except Exception as e:
+            raise RuntimeError(f"流式结构化内容生成失败: {str(e)}")
+
+    async def agenerate_structured_content_stream(self, prompt, response_schema):
+        """
+        使用SDK原生的异步客户端流式生成结构化内容，等待响应期间不占用线程
+
+        Args:
+            prompt (str): 提示词
+            response_schema: Pydantic模型类，用于定义响应结构
+
+        Yields:
+            str: 生成的JSON文本块
+        """
+        try:
+            response = await self.client.aio.models.generate_content_stream(
+                model=self.model_name,
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    temperature=self.temperature,
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                )
+            )
+
+            # 流式输出每个chunk，用量信息随最后的chunk返回
+            usage = None
+            async for chunk in response:
+                usage = getattr(chunk, 'usage_metadata', None) or usage
+                if hasattr(chunk, 'text') and chunk.text:
+                    yield chunk.text
+                elif hasattr(chunk, 'parts'):
+                    for part in chunk.parts:
+                        if hasattr(part, 'text') and part.text:
+                            yield part.text
 
-            for chunk_text in self.generate_structured_content_stream(prompt, response_schema):
-                full_json_text += chunk_text
-                if show_progress:
-                    print(chunk_text, end="", flush=True)
+            self._report_usage(usage)
 
-            if show_progress:
-                print()  # 换行
+        except Exception as e:
+            raise RuntimeError(f"Gemini异步流式结构化输出API调用失败: {str(e)}")
 
-            # 解析为结构化对象
-            return response_schema.model_validate_json(full_json_text)
+    async def agenerate_structured_content_with_stream(self, prompt, response_schema, show_progress=False, use_cache=True,
+                                                       raw_json=False):
+        """
+        generate_structured_content_with_stream的原生异步版本，文本块到达时即在事件循环中拼接
+
+        Args:
+            prompt (str): 提示词
+            response_schema: Pydantic模型类，用于定义响应结构
+            show_progress (bool): 是否显示生成进度
+            use_cache (bool): 是否读取响应缓存；为False时重新生成并刷新缓存
+            raw_json (bool): 为True时response_schema只用于约束模型的输出格式，直接返回解析出的字典，
+                跳过Pydantic校验（响应中的大段HTML字符串不必再复制一次）
+
+        Returns:
+            解析后的结构化对象，raw_json为True时为字典
+        """
+        key = self._cache_key(prompt, response_schema)
+        if use_cache:
+            cached = await asyncio.to_thread(self._read_cache, key, '.json')
+            if cached is not None:
+                # 解析失败的缓存视为未命中，重新生成
+                try:
+                    return self._parse_structured(cached, response_schema, raw_json)
+                except Exception:
+                    pass
+
+        try:
+            full_json_text = await self._acollect_stream(
+                self.agenerate_structured_content_stream(prompt, response_schema), show_progress
+            )
+
+            # 解析为结构化对象，成功后才写入缓存
+            result = self._parse_structured(full_json_text, response_schema, raw_json)
+            await asyncio.to_thread(self._write_cache, key, '.json', full_json_text)
+            return result
 
         except Exception as e:
             raise RuntimeError(f"流式结构化内容生成失败: {str(e)}")
+
+    @staticmethod
+    def _parse_structured(json_text, response_schema, raw_json=False):
+        """按需把JSON响应解析为字典或校验为Pydantic对象"""
+        if raw_json:
+            data = _json_loads(json_text)
+            if not isinstance(data, dict):
+                raise ValueError(f"结构化响应应为JSON对象，实际为{type(data).__name__}")
+            return data
+        return response_schema.model_validate_json(json_text)
@@ -6,14 +6,89 @@
 项目：系列技术文章翻译
 """
 
+import concurrent.futures
+import copy
+import functools
+import itertools
 import logging
+import os
 import re
+import string
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
-from urllib.parse import urlparse
-from bs4 import BeautifulSoup, Tag
+from typing import Dict, Iterable, List, Optional, Tuple, Set
+from bs4 import BeautifulSoup, SoupStrainer, Tag
 
 from config.settings import TRANS_DIR
+from file_utils import (
+    mtime_cache_key, names_cache_key, load_json_cache, save_json_cache,
+    mmap_file, scan_html_files, iter_html_files, atomic_write
+)
+from url_utils import url_to_filename
+
+# 页头信息模板，$url 为原文链接
+_HEADER_TEMPLATE = '''
+        <div class="translation-info base-grid" style="margin-bottom: 20px;">
+            <div style="grid-column: text;
+                       display: flex;
+                       align-items: center;
+                       justify-content: space-between;
+                       padding: 16px 0;
+                       border-bottom: 1px solid var(--global-text-color-light, rgba(0,0,0,0.15));
+                       font-size: 16px;
+                       line-height: 1.5;
+                       color: var(--global-text-color, currentColor);">
+                <div style="display: flex;
+                           flex-direction: column;
+                           gap: 8px;">
+                    <div>
+                        <span style="font-weight: 600; color: var(--global-text-color, currentColor);">🔗 英文原文：</span>
+                        <a href="$url"
+                           target="_blank"
+                           rel="noopener noreferrer"
+                           style="color: var(--global-theme-color, #004276);
+                                  text-decoration: none;
+                                  margin-left: 4px;"
+                           onmouseover="this.style.textDecoration='underline'"
+                           onmouseout="this.style.textDecoration='none'">
+                           $url
+                        </a>
+                    </div>
+                    <div>
+                        <span style="font-weight: 600; color: var(--global-text-color, currentColor);">✍️ 翻译：</span>
+                        <span style="margin-left: 4px; color: var(--global-text-color, currentColor);">$translator</span>
+                    </div>
+                </div>
+                <div style="flex-shrink: 0;
+                           display: flex;
+                           flex-direction: column;
+                           align-items: center;
+                           gap: 6px;
+                           margin-left: 20px;">
+                    <img src="$qr_url"
+                         alt="微信二维码"
+                         style="width: 80px;
+                                height: 80px;
+                                border-radius: 6px;
+                                opacity: 0.9;"
+                         loading="lazy">
+                    <span style="font-size: 12px;
+                                 color: var(--global-text-color-light, currentColor);
+                                 opacity: 0.8;
+                                 text-align: center;">
+                        微信公众号
+                    </span>
+                </div>
+            </div>
+        </div>'''
+
+# 探测插入点时只解析可能作为插入点的标签
+_INSERTION_STRAINER = SoupStrainer(['div', 'd-title'])
+
+# 插入点 <div class="post distill"> 的开始标签，在原始字节上匹配
+_POST_DISTILL_RE = re.compile(rb'<div\s+class=(["\'])post distill\1[^>]*>')
+
+# 流式提交给进程池时每批的文件数（文件总数事先未知）
+_POOL_CHUNKSIZE = 4
 
 
 class HeaderInfoAdder:
@@ -40,6 +115,9 @@ class HeaderInfoAdder:
         # 文件名到原始URL的映射字典
         self.file_url_mapping: Dict[str, str] = {}
 
+        # 映射缓存放在翻译目录之外，不会混入翻译后的页面
+        self._mapping_cache_path = self.trans_dir.parent / ".file_url_mapping.json"
+
         # 统计信息
         self.stats = {
             'files_processed': 0,
@@ -52,8 +130,22 @@ class HeaderInfoAdder:
         self.translator_name = "北极的树"
         self.wechat_qr_url = "https://wechat-account-1251781786.cos.ap-guangzhou.myqcloud.com/wechat_account.jpeg"
 
+        # 翻译者信息在实例内固定，预先填入模板，只留下原文链接占位符
+        self._header_tpl = string.Template(
+            string.Template(_HEADER_TEMPLATE.strip()).safe_substitute(
+                translator=self.translator_name, qr_url=self.wechat_qr_url
+            )
+        )
+        self._header_prototype: Optional[Tag] = None
+
         self.logger.info(f"页头信息添加器初始化完成，目标目录: {self.trans_dir}")
 
+    def __getstate__(self):
+        # 传给子进程时不携带已解析的页头标签，子进程按需重新解析
+        state = self.__dict__.copy()
+        state['_header_prototype'] = None
+        return state
+
     def build_file_url_mapping(self) -> Dict[str, str]:
         """
         构建文件名到原始URL的映射关系
@@ -65,9 +157,18 @@ class HeaderInfoAdder:
             self.file_url_mapping.clear()
 
             # 获取实际存在的HTML文件
-            existing_files = set()
-            for html_file in self.trans_dir.glob("*.html"):
-                existing_files.add(html_file.name)
+            existing_files = {entry.name for entry in scan_html_files(self.trans_dir)}
+
+            # URL配置文件和翻译目录中的文件名都没有变化时直接复用上次的映射。
+            # 按文件名而非目录修改时间判断：改写页面（临时文件+替换）会改变目录的修改时间
+            cache_key = mtime_cache_key(self.urls_config)
+            if cache_key is not None:
+                cache_key.append(names_cache_key(existing_files))
+            cached = load_json_cache(self._mapping_cache_path, cache_key)
+            if cached is not None:
+                self.file_url_mapping.update(cached)
+                self.logger.info(f"从缓存加载了 {len(self.file_url_mapping)} 个文件URL映射")
+                return self.file_url_mapping
 
             self.logger.info(f"找到 {len(existing_files)} 个现有HTML文件")
 
@@ -82,12 +183,14 @@ class HeaderInfoAdder:
                             continue
 
                         # 解析URL并生成本地文件名
-                        local_filename = self._url_to_filename(line)
+                        local_filename = url_to_filename(line)
 
                         # 只映射实际存在的文件
                         if local_filename in existing_files:
                             self.file_url_mapping[local_filename] = line
 
+            save_json_cache(self._mapping_cache_path, cache_key, self.file_url_mapping)
+
             self.logger.info(f"构建了 {len(self.file_url_mapping)} 个文件URL映射")
             for filename, url in sorted(self.file_url_mapping.items()):
                 self.logger.debug(f"  {filename} -> {url}")
@@ -98,107 +201,39 @@ class HeaderInfoAdder:
             self.logger.error(f"构建文件URL映射失败: {str(e)}")
             return {}
 
-    def _url_to_filename(self, url: str) -> str:
+    def create_header_html(self, original_url: str) -> str:
         """
-        将URL转换为本地文件名
+        生成页头信息的HTML内容
 
         Args:
-            url (str): 原始URL
+            original_url (str): 原始文章URL
 
         Returns:
-            str: 本地文件名
+            str: 生成的HTML字符串
         """
-        try:
-            parsed = urlparse(url)
-            path = parsed.path.strip('/')
-
-            if not path or path == "scaling-book":
-                # 主页情况
-                return "scaling-book.html"
-
-            # 提取最后一个路径段作为文件名
-            if path.startswith("scaling-book/"):
-                page_name = path.replace("scaling-book/", "")
-                if page_name:
-                    return f"{page_name}.html"
-
-            # 如果路径不包含scaling-book，直接使用最后一段
-            path_parts = path.split('/')
-            if path_parts:
-                return f"{path_parts[-1]}.html"
-
-            return "scaling-book.html"
+        return self._header_tpl.substitute(url=original_url)
 
-        except Exception as e:
-            self.logger.warning(f"URL转文件名失败 {url}: {str(e)}")
-            return "unknown.html"
-
-    def create_header_html(self, original_url: str) -> str:
+    def _create_header_tag(self, original_url: str) -> Tag:
         """
-        生成页头信息的HTML内容
+        生成页头信息的标签
+
+        页头模板只解析一次，之后每个文件复制解析好的标签并填入原文链接。
 
         Args:
             original_url (str): 原始文章URL
 
         Returns:
-            str: 生成的HTML字符串
+            Tag: 可直接插入文档的页头标签
         """
-        header_html = f'''
-        <div class="translation-info base-grid" style="margin-bottom: 20px;">
-            <div style="grid-column: text;
-                       display: flex;
-                       align-items: center;
-                       justify-content: space-between;
-                       padding: 16px 0;
-                       border-bottom: 1px solid var(--global-text-color-light, rgba(0,0,0,0.15));
-                       font-size: 16px;
-                       line-height: 1.5;
-                       color: var(--global-text-color, currentColor);">
-                <div style="display: flex;
-                           flex-direction: column;
-                           gap: 8px;">
-                    <div>
-                        <span style="font-weight: 600; color: var(--global-text-color, currentColor);">🔗 英文原文：</span>
-                        <a href="{original_url}"
-                           target="_blank"
-                           rel="noopener noreferrer"
-                           style="color: var(--global-theme-color, #004276);
-                                  text-decoration: none;
-                                  margin-left: 4px;"
-                           onmouseover="this.style.textDecoration='underline'"
-                           onmouseout="this.style.textDecoration='none'">
-                           {original_url}
-                        </a>
-                    </div>
-                    <div>
-                        <span style="font-weight: 600; color: var(--global-text-color, currentColor);">✍️ 翻译：</span>
-                        <span style="margin-left: 4px; color: var(--global-text-color, currentColor);">{self.translator_name}</span>
-                    </div>
-                </div>
-                <div style="flex-shrink: 0;
-                           display: flex;
-                           flex-direction: column;
-                           align-items: center;
-                           gap: 6px;
-                           margin-left: 20px;">
-                    <img src="{self.wechat_qr_url}"
-                         alt="微信二维码"
-                         style="width: 80px;
-                                height: 80px;
-                                border-radius: 6px;
-                                opacity: 0.9;"
-                         loading="lazy">
-                    <span style="font-size: 12px;
-                                 color: var(--global-text-color-light, currentColor);
-                                 opacity: 0.8;
-                                 text-align: center;">
-                        微信公众号
-                    </span>
-                </div>
-            </div>
-        </div>'''
+        if self._header_prototype is None:
+            # lxml会把片段包裹在<html><body>中，只取出页头本身的div
+            self._header_prototype = BeautifulSoup(self._header_tpl.template, 'lxml').body.div
 
-        return header_html.strip()
+        header_tag = copy.copy(self._header_prototype)
+        link = header_tag.find('a')
+        link['href'] = original_url
+        link.string = link.string.replace('$url', original_url)
+        return header_tag
 
     def find_insertion_point(self, soup: BeautifulSoup) -> Optional[Tag]:
         """
@@ -236,69 +271,118 @@ class HeaderInfoAdder:
             self.logger.error(f"查找插入点失败: {str(e)}")
             return None
 
-    def process_html_file(self, file_path: Path) -> bool:
+    def _insert_header_with_soup(self, html_bytes: bytes, original_url: str) -> Optional[bytes]:
+        """
+        解析文档并在插入点开头插入页头（类名顺序不同或只有d-title等无法直接拼接的情况）
+
+        Args:
+            html_bytes (bytes): 原始HTML字节
+            original_url (str): 原始文章URL
+
+        Returns:
+            Optional[bytes]: 插入页头后的HTML字节，找不到插入点时返回None
+        """
+        # 先用只解析候选标签的轻量解析探测插入点，找不到时无需完整解析
+        # 直接传入字节并指定编码，避免BeautifulSoup的编码探测
+        probe = BeautifulSoup(html_bytes, 'lxml', parse_only=_INSERTION_STRAINER, from_encoding='utf-8')
+        if self.find_insertion_point(probe) is None:
+            return None
+
+        # 解析完整HTML（修改后需要完整序列化）
+        soup = BeautifulSoup(html_bytes, 'lxml', from_encoding='utf-8')
+
+        # 查找插入点
+        insertion_point = self.find_insertion_point(soup)
+        if not insertion_point:
+            return None
+
+        # 生成页头信息
+        header_tag = self._create_header_tag(original_url)
+
+        # 插入页头信息（在容器的开头）
+        if insertion_point.contents:
+            # 在第一个子元素之前插入
+            insertion_point.insert(0, header_tag)
+        else:
+            # 如果容器为空，直接添加
+            insertion_point.append(header_tag)
+
+        return str(soup).encode('utf-8')
+
+    def process_html_file(self, file_path: Path, dry_run: bool = False) -> bool:
         """
         处理单个HTML文件
 
         Args:
             file_path (Path): HTML文件路径
+            dry_run (bool): 为True时只检查能否添加页头，不写入文件也不计入统计
 
         Returns:
             bool: 处理是否成功
         """
+        def count(*keys: str) -> None:
+            # 试运行不改动统计信息，不影响之后批量处理时汇报的数字
+            if not dry_run:
+                for key in keys:
+                    self.stats[key] += 1
+
         try:
-            self.logger.info(f"处理文件: {file_path.name}")
+            self.logger.debug("处理文件: %s", file_path.name)
 
             # 检查是否有对应的原始URL
             filename = file_path.name
             if filename not in self.file_url_mapping:
                 self.logger.warning(f"未找到文件 {filename} 的原始URL映射，跳过处理")
-                self.stats['files_skipped'] += 1
+                count('files_skipped')
                 return True
 
             original_url = self.file_url_mapping[filename]
 
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            # 检查是否已经添加过页头信息
-            if 'translation-info' in html_content:
-                self.logger.info(f"⏭️  {filename}: 已包含页头信息，跳过处理")
-                self.stats['files_skipped'] += 1
-                return True
-
-            # 解析HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            # 查找插入点
-            insertion_point = self.find_insertion_point(soup)
-            if not insertion_point:
-                self.logger.error(f"未找到 {filename} 的插入点")
-                self.stats['files_skipped'] += 1
-                return False
-
-            # 生成页头信息HTML
-            header_html = self.create_header_html(original_url)
-            header_soup = BeautifulSoup(header_html, 'html.parser')
-
-            # 插入页头信息（在容器的开头）
-            if insertion_point.contents:
-                # 在第一个子元素之前插入
-                insertion_point.insert(0, header_soup)
+            # 通过内存映射读取，预筛选直接在字节上完成，跳过的文件无需整体读入
+            with mmap_file(file_path) as mm:
+                # 检查是否已经添加过页头信息
+                if mm.find(b'translation-info') != -1:
+                    self.logger.debug("⏭️  %s: 已包含页头信息，跳过处理", filename)
+                    count('files_skipped')
+                    return True
+
+                # 不包含任何候选插入点标记的文件无需解析
+                if mm.find(b'distill') == -1 and mm.find(b'd-title') == -1:
+                    self.logger.error(f"未找到 {filename} 的插入点")
+                    count('files_skipped')
+                    return False
+
+                html_bytes = mm[:]
+
+            # 常见情况：直接在原始字节中定位 <div class="post distill"> 的开始标签，
+            # 把页头片段拼接在其后，无需解析和重新序列化整个文档
+            match = _POST_DISTILL_RE.search(html_bytes)
+            if match:
+                header_bytes = self.create_header_html(original_url).encode('utf-8')
+                new_bytes = html_bytes[:match.end()] + header_bytes + html_bytes[match.end():]
             else:
-                # 如果容器为空，直接添加
-                insertion_point.append(header_soup)
+                new_bytes = self._insert_header_with_soup(html_bytes, original_url)
+                if new_bytes is None:
+                    self.logger.error(f"未找到 {filename} 的插入点")
+                    count('files_skipped')
+                    return False
+
+                # 内容没有变化时不必写回磁盘
+                if new_bytes == html_bytes:
+                    self.logger.debug("⏭️  %s: 内容未变化，无需写入", filename)
+                    count('files_processed')
+                    return True
+
+            if dry_run:
+                self.logger.debug("🔍 %s: 可以添加页头信息（试运行，未写入）", filename)
+                return True
 
             # 保存修改后的HTML
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(str(soup))
+            atomic_write(file_path, new_bytes)
 
-            self.stats['files_processed'] += 1
-            self.stats['files_modified'] += 1
-            self.stats['headers_added'] += 1
+            count('files_processed', 'files_modified', 'headers_added')
 
-            self.logger.info(f"✅ {filename}: 成功添加页头信息")
+            self.logger.debug("✅ %s: 成功添加页头信息", filename)
             return True
 
         except Exception as e:
@@ -328,29 +412,23 @@ class HeaderInfoAdder:
                 self.logger.error("无法构建文件URL映射，停止处理")
                 return self.stats
 
-            # 获取所有HTML文件
-            html_files = list(self.trans_dir.glob("*.html"))
-            if not html_files:
+            # 边列目录边处理每个文件
+            success_count, total_count = self._process_files()
+            if not total_count:
                 self.logger.warning("未找到HTML文件")
                 return self.stats
 
-            self.logger.info(f"找到 {len(html_files)} 个HTML文件")
-
-            # 处理每个文件
-            success_count = 0
-            for html_file in html_files:
-                if self.process_html_file(html_file):
-                    success_count += 1
-
             # 打印统计结果
-            self.logger.info("=" * 50)
-            self.logger.info("批量处理完成统计:")
-            self.logger.info(f"  📁 总文件数: {len(html_files)}")
-            self.logger.info(f"  ✅ 成功处理: {success_count}")
-            self.logger.info(f"  📝 修改文件: {self.stats['files_modified']}")
-            self.logger.info(f"  🏷️  添加页头: {self.stats['headers_added']}")
-            self.logger.info(f"  ⏭️  跳过文件: {self.stats['files_skipped']}")
-            self.logger.info("=" * 50)
+            self.logger.info("\n".join([
+                "=" * 50,
+                "批量处理完成统计:",
+                f"  📁 总文件数: {total_count}",
+                f"  ✅ 成功处理: {success_count}",
+                f"  📝 修改文件: {self.stats['files_modified']}",
+                f"  🏷️  添加页头: {self.stats['headers_added']}",
+                f"  ⏭️  跳过文件: {self.stats['files_skipped']}",
+                "=" * 50,
+            ]))
 
             return self.stats
 
@@ -358,11 +436,66 @@ class HeaderInfoAdder:
             self.logger.error(f"批量处理失败: {str(e)}")
             return self.stats
 
+    def _process_files(self) -> Tuple[int, int]:
+        """
+        在进程池中并行处理文件，并汇总各文件的统计信息
+
+        每个文件相互独立且处理过程是CPU密集型的HTML解析，适合多进程并行；
+        文件以流的方式从目录中读出后直接提交给进程池，无需等待目录扫描完成。
+        进程池不可用时退回到逐个处理。
+
+        Returns:
+            Tuple[int, int]: (处理成功的文件数, 文件总数)
+        """
+        html_files = (Path(entry.path) for entry in iter_html_files(self.trans_dir))
+
+        # 先取出两个文件，只有一个文件时无需启动进程池
+        head = list(itertools.islice(html_files, 2))
+        workers = os.cpu_count() or 1
+        if len(head) < 2 or workers < 2:
+            return self._process_files_sequentially(itertools.chain(head, html_files))
+
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    functools.partial(_process_file_worker, self),
+                    itertools.chain(head, html_files),
+                    chunksize=_POOL_CHUNKSIZE
+                ))
+        except (OSError, NotImplementedError) as e:
+            self.logger.warning(f"无法启动进程池，改为逐个处理: {str(e)}")
+            return self._process_files_sequentially(
+                Path(entry.path) for entry in iter_html_files(self.trans_dir)
+            )
+
+        success_count = 0
+        for success, stats_delta in results:
+            success_count += success
+            for key, value in stats_delta.items():
+                self.stats[key] += value
+
+        return success_count, len(results)
+
+    def _process_files_sequentially(self, html_files: Iterable[Path]) -> Tuple[int, int]:
+        """在当前进程中逐个处理文件，返回(处理成功的文件数, 文件总数)"""
+        success_count = total_count = 0
+        for html_file in html_files:
+            total_count += 1
+            success_count += self.process_html_file(html_file)
+        return success_count, total_count
+
     def get_stats(self) -> Dict[str, int]:
         """获取处理统计信息"""
         return self.stats.copy()
 
 
+def _process_file_worker(adder: HeaderInfoAdder, file_path: Path) -> Tuple[bool, Dict[str, int]]:
+    """进程池工作函数：处理单个文件，返回是否成功及该文件产生的统计增量"""
+    adder.stats = dict.fromkeys(adder.stats, 0)
+    success = adder.process_html_file(file_path)
+    return success, adder.stats
+
+
 # 便捷函数
 def add_headers_to_all_files(trans_dir: str = None) -> Dict[str, int]:
     """
@@ -424,12 +557,11 @@ async def test_single_file():
 
         print(f"\n🔄 测试文件: {test_file.name}")
 
-        # 处理文件
-        success = adder.process_html_file(test_file)
+        # 试运行处理文件，真正的写入留给批量处理
+        success = adder.process_html_file(test_file, dry_run=True)
 
         if success:
-            print("✅ 单个文件测试成功!")
-            print(f"📊 处理统计: {adder.get_stats()}")
+            print("✅ 单个文件测试成功!（试运行，未写入文件）")
         else:
             print("❌ 单个文件处理失败")
 
@@ -481,10 +613,14 @@ async def process_all_pages():
 async def main():
     """主函数"""
     from config.logging_config import setup_logging
+    from config.settings import config
 
     # 设置日志
     setup_logging('INFO')
 
+    # 单独运行时不经过main.py的组件初始化，需要自行创建输出目录
+    config.ensure_dirs()
+
     print("页头信息添加工具")
     print("=" * 50)
 
@@ -6,15 +6,25 @@
 项目：系列技术文章翻译
 """
 
+import concurrent.futures
+import functools
+import itertools
 import logging
+import os
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
-from urllib.parse import urlparse, urljoin
-from bs4 import BeautifulSoup
+from typing import Dict, Iterable, List, Optional, Tuple, Set
+from urllib.parse import urljoin
 
 from config.settings import TRANS_DIR
+from file_utils import (
+    mtime_cache_key, names_cache_key, load_json_cache, save_json_cache,
+    mmap_file, scan_html_files, iter_html_files, atomic_write
+)
+from url_utils import url_to_filename
 
+# 流式提交给进程池时每批的文件数（文件总数事先未知）
+_POOL_CHUNKSIZE = 4
 
 class LinkLocalizer:
     """将HTML文件中的绝对链接转换为本地相对链接"""
@@ -40,6 +50,9 @@ class LinkLocalizer:
         # URL映射字典：绝对URL -> 本地文件名
         self.url_mapping: Dict[str, str] = {}
 
+        # 映射缓存放在翻译目录之外，不会混入翻译后的页面
+        self._mapping_cache_path = self.trans_dir.parent / ".url_mapping.json"
+
         # 统计信息
         self.stats = {
             'files_processed': 0,
@@ -50,6 +63,13 @@ class LinkLocalizer:
 
         # 基础域名模式
         self.base_domain = "https://jax-ml.github.io/scaling-book"
+        self._base_domain_bytes = self.base_domain.encode('utf-8')
+
+        # 匹配所有指向目标域名的href属性，与映射中URL的数量无关；
+        # 左侧边界排除data-href、xlink:href等其他属性，并容忍等号两侧的空白
+        self._href_re = re.compile(
+            r'((?<![\w:-])(?i:href)\s*=\s*(["\']))(' + re.escape(self.base_domain) + r'[^"\']*)\2'
+        )
 
         self.logger.info(f"链接本地化器初始化完成，目标目录: {self.trans_dir}")
 
@@ -64,9 +84,18 @@ class LinkLocalizer:
             self.url_mapping.clear()
 
             # 获取实际存在的HTML文件
-            existing_files = set()
-            for html_file in self.trans_dir.glob("*.html"):
-                existing_files.add(html_file.name)
+            existing_files = {entry.name for entry in scan_html_files(self.trans_dir)}
+
+            # URL配置文件和翻译目录中的文件名都没有变化时直接复用上次的映射。
+            # 按文件名而非目录修改时间判断：改写页面（临时文件+替换）会改变目录的修改时间
+            cache_key = mtime_cache_key(self.urls_config)
+            if cache_key is not None:
+                cache_key.append(names_cache_key(existing_files))
+            cached = load_json_cache(self._mapping_cache_path, cache_key)
+            if cached is not None:
+                self.url_mapping.update(cached)
+                self.logger.info(f"从缓存加载了 {len(self.url_mapping)} 个URL映射")
+                return self.url_mapping
 
             self.logger.info(f"找到 {len(existing_files)} 个现有HTML文件: {sorted(existing_files)}")
 
@@ -74,29 +103,26 @@ class LinkLocalizer:
             urls_file = Path(self.urls_config)
             if urls_file.exists():
                 with open(urls_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        # 跳过注释和空行
-                        if not line or line.startswith('#'):
-                            continue
-
-                        # 解析URL并生成本地文件名
-                        local_filename = self._url_to_filename(line)
-
-                        # 只映射实际存在的文件
-                        if local_filename in existing_files:
-                            self.url_mapping[line] = local_filename
-                            # 同时处理带尾部斜杠的版本
-                            if line.endswith('/'):
-                                self.url_mapping[line.rstrip('/')] = local_filename
-                            else:
-                                self.url_mapping[line + '/'] = local_filename
+                    # 跳过注释和空行
+                    lines = [line for line in map(str.strip, f) if line and not line.startswith('#')]
+
+                # 只映射实际存在的文件，带与不带尾部斜杠的版本都无条件加入，一次性更新
+                pairs = []
+                for line in lines:
+                    local_filename = url_to_filename(line)
+                    if local_filename in existing_files:
+                        stripped = line.rstrip('/')
+                        pairs.append((stripped, local_filename))
+                        pairs.append((stripped + '/', local_filename))
+                self.url_mapping.update(pairs)
 
             # 处理主页特殊情况
             if "scaling-book.html" in existing_files:
                 self.url_mapping[self.base_domain] = "scaling-book.html"
                 self.url_mapping[self.base_domain + "/"] = "scaling-book.html"
 
+            save_json_cache(self._mapping_cache_path, cache_key, self.url_mapping)
+
             self.logger.info(f"构建了 {len(self.url_mapping)} 个URL映射")
             for url, filename in sorted(self.url_mapping.items()):
                 self.logger.debug(f"  {url} -> {filename}")
@@ -107,64 +133,62 @@ class LinkLocalizer:
             self.logger.error(f"构建URL映射失败: {str(e)}")
             return {}
 
-    def _url_to_filename(self, url: str) -> str:
+    def _is_local_link(self, url: str) -> bool:
         """
-        将URL转换为本地文件名
+        判断是否为需要本地化的链接
 
         Args:
-            url (str): 原始URL
+            url (str): 要检查的URL
 
         Returns:
-            str: 本地文件名
+            bool: 是否为本地链接
         """
-        try:
-            parsed = urlparse(url)
-            path = parsed.path.strip('/')
+        # 以目标域名开头的链接不可能是锚点或mailto:、tel:、javascript:等其他协议，
+        # 因此单次前缀判断即可覆盖全部跳过规则
+        return bool(url) and url.startswith(self.base_domain)
 
-            if not path or path == "scaling-book":
-                # 主页情况
-                return "scaling-book.html"
-
-            # 提取最后一个路径段作为文件名
-            if path.startswith("scaling-book/"):
-                page_name = path.replace("scaling-book/", "")
-                if page_name:
-                    return f"{page_name}.html"
+    def _lookup_local_file(self, href: str) -> Optional[str]:
+        """
+        查找链接对应的本地文件
 
-            # 如果路径不包含scaling-book，直接使用最后一段
-            path_parts = path.split('/')
-            if path_parts:
-                return f"{path_parts[-1]}.html"
+        Args:
+            href (str): 链接地址
 
-            return "scaling-book.html"
+        Returns:
+            Optional[str]: 本地文件名，不是本地链接或没有映射时返回None
+        """
+        if not self._is_local_link(href):
+            return None
 
-        except Exception as e:
-            self.logger.warning(f"URL转文件名失败 {url}: {str(e)}")
-            return "unknown.html"
+        # 检查是否有对应的本地文件（同时尝试移除尾部斜杠进行匹配）
+        local_file = self.url_mapping.get(href) or self.url_mapping.get(href.rstrip('/'))
+        if local_file:
+            self.logger.debug("转换链接: %s -> %s", href, local_file)
+        else:
+            self.logger.warning(f"未找到本地文件映射: {href}")
+            self.stats['links_skipped'] += 1
+        return local_file
 
-    def _is_local_link(self, url: str) -> bool:
+    def _convert_with_regex(self, html_content: str) -> Tuple[str, int]:
         """
-        判断是否为需要本地化的链接
-
-        Args:
-            url (str): 要检查的URL
+        使用预编译正则直接替换文本中的链接，无需构建DOM
 
-        Returns:
-            bool: 是否为本地链接
+        一次线性扫描找出所有指向目标域名的href，再通过字典查找本地文件名。
         """
-        if not url:
-            return False
+        converted_count = 0
 
-        # 跳过锚点链接
-        if url.startswith('#'):
-            return False
+        def replace(match):
+            nonlocal converted_count
+            local_file = self._lookup_local_file(match.group(3))
+            if not local_file:
+                return match.group(0)
 
-        # 跳过其他协议
-        if url.startswith(('mailto:', 'tel:', 'javascript:')):
-            return False
+            converted_count += 1
+            # 保留原属性名及等号两侧的写法，只替换URL
+            return f'{match.group(1)}{local_file}{match.group(2)}'
 
-        # 检查是否为目标域名的链接
-        return url.startswith(self.base_domain)
+        converted_content = self._href_re.sub(replace, html_content)
+        return converted_content, converted_count
 
     def _convert_links_in_html(self, html_content: str) -> Tuple[str, int]:
         """
@@ -177,42 +201,8 @@ class LinkLocalizer:
             Tuple[str, int]: (转换后的HTML内容, 转换的链接数量)
         """
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            converted_count = 0
-
-            # 查找所有带href属性的标签
-            for tag in soup.find_all(attrs={'href': True}):
-                href = tag.get('href')
-
-                if self._is_local_link(href):
-                    # 规范化URL（移除尾部斜杠进行匹配）
-                    normalized_url = href.rstrip('/')
-
-                    # 检查是否有对应的本地文件
-                    if href in self.url_mapping:
-                        local_file = self.url_mapping[href]
-                        tag['href'] = local_file
-                        converted_count += 1
-                        self.logger.debug(f"转换链接: {href} -> {local_file}")
-                    elif normalized_url in self.url_mapping:
-                        local_file = self.url_mapping[normalized_url]
-                        tag['href'] = local_file
-                        converted_count += 1
-                        self.logger.debug(f"转换链接: {href} -> {local_file}")
-                    else:
-                        self.logger.warning(f"未找到本地文件映射: {href}")
-                        self.stats['links_skipped'] += 1
-
-            # 查找所有带src属性的标签（处理资源文件）
-            for tag in soup.find_all(attrs={'src': True}):
-                src = tag.get('src')
-
-                if self._is_local_link(src):
-                    # 对于资源文件，我们可能需要不同的处理策略
-                    # 暂时跳过，因为主要关注页面导航链接
-                    self.logger.debug(f"跳过资源文件: {src}")
-
-            return str(soup), converted_count
+            # process_all_files在映射为空时已停止处理，这里总有映射可查，直接按正则改写href
+            return self._convert_with_regex(html_content)
 
         except Exception as e:
             self.logger.error(f"转换HTML链接失败: {str(e)}")
@@ -229,25 +219,28 @@ class LinkLocalizer:
             bool: 处理是否成功
         """
         try:
-            self.logger.info(f"处理文件: {file_path.name}")
+            self.logger.debug("处理文件: %s", file_path.name)
 
-            # 读取文件内容
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            # 通过内存映射读取，不包含目标域名的文件无需解码和解析
+            with mmap_file(file_path) as mm:
+                if mm.find(self._base_domain_bytes) == -1:
+                    self.logger.debug("⏭️  %s: 无需转换", file_path.name)
+                    self.stats['files_processed'] += 1
+                    return True
+                original_content = mm[:].decode('utf-8')
 
             # 转换链接
             converted_content, converted_count = self._convert_links_in_html(original_content)
 
-            # 如果有转换，则保存文件
-            if converted_count > 0:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(converted_content)
+            # 如果有转换且内容确实变化，则保存文件
+            if converted_count > 0 and converted_content != original_content:
+                atomic_write(file_path, converted_content)
 
                 self.stats['files_modified'] += 1
                 self.stats['links_converted'] += converted_count
-                self.logger.info(f"✅ {file_path.name}: 转换了 {converted_count} 个链接")
+                self.logger.debug("✅ %s: 转换了 %d 个链接", file_path.name, converted_count)
             else:
-                self.logger.info(f"⏭️  {file_path.name}: 无需转换")
+                self.logger.debug("⏭️  %s: 无需转换", file_path.name)
 
             self.stats['files_processed'] += 1
             return True
@@ -279,29 +272,23 @@ class LinkLocalizer:
                 self.logger.error("无法构建UxRL映射，停止处理")
                 return self.stats
 
-            # 获取所有HTML文件
-            html_files = list(self.trans_dir.glob("*.html"))
-            if not html_files:
+            # 边列目录边处理每个文件
+            success_count, total_count = self._process_files()
+            if not total_count:
                 self.logger.warning("未找到HTML文件")
                 return self.stats
 
-            self.logger.info(f"找到 {len(html_files)} 个HTML文件")
-
-            # 处理每个文件
-            success_count = 0
-            for html_file in html_files:
-                if self.process_html_file(html_file):
-                    success_count += 1
-
             # 打印统计结果
-            self.logger.info("=" * 50)
-            self.logger.info("批量处理完成统计:")
-            self.logger.info(f"  📁 总文件数: {len(html_files)}")
-            self.logger.info(f"  ✅ 成功处理: {success_count}")
-            self.logger.info(f"  📝 修改文件: {self.stats['files_modified']}")
-            self.logger.info(f"  🔗 转换链接: {self.stats['links_converted']}")
-            self.logger.info(f"  ⏭️  跳过链接: {self.stats['links_skipped']}")
-            self.logger.info("=" * 50)
+            self.logger.info("\n".join([
+                "=" * 50,
+                "批量处理完成统计:",
+                f"  📁 总文件数: {total_count}",
+                f"  ✅ 成功处理: {success_count}",
+                f"  📝 修改文件: {self.stats['files_modified']}",
+                f"  🔗 转换链接: {self.stats['links_converted']}",
+                f"  ⏭️  跳过链接: {self.stats['links_skipped']}",
+                "=" * 50,
+            ]))
 
             return self.stats
 
@@ -309,11 +296,66 @@ class LinkLocalizer:
             self.logger.error(f"批量处理失败: {str(e)}")
             return self.stats
 
+    def _process_files(self) -> Tuple[int, int]:
+        """
+        在进程池中并行处理文件，并汇总各文件的统计信息
+
+        每个文件相互独立且处理过程是CPU密集型的HTML解析，适合多进程并行；
+        文件以流的方式从目录中读出后直接提交给进程池，无需等待目录扫描完成。
+        进程池不可用时退回到逐个处理。
+
+        Returns:
+            Tuple[int, int]: (处理成功的文件数, 文件总数)
+        """
+        html_files = (Path(entry.path) for entry in iter_html_files(self.trans_dir))
+
+        # 先取出两个文件，只有一个文件时无需启动进程池
+        head = list(itertools.islice(html_files, 2))
+        workers = os.cpu_count() or 1
+        if len(head) < 2 or workers < 2:
+            return self._process_files_sequentially(itertools.chain(head, html_files))
+
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(
+                    functools.partial(_process_file_worker, self),
+                    itertools.chain(head, html_files),
+                    chunksize=_POOL_CHUNKSIZE
+                ))
+        except (OSError, NotImplementedError) as e:
+            self.logger.warning(f"无法启动进程池，改为逐个处理: {str(e)}")
+            return self._process_files_sequentially(
+                Path(entry.path) for entry in iter_html_files(self.trans_dir)
+            )
+
+        success_count = 0
+        for success, stats_delta in results:
+            success_count += success
+            for key, value in stats_delta.items():
+                self.stats[key] += value
+
+        return success_count, len(results)
+
+    def _process_files_sequentially(self, html_files: Iterable[Path]) -> Tuple[int, int]:
+        """在当前进程中逐个处理文件，返回(处理成功的文件数, 文件总数)"""
+        success_count = total_count = 0
+        for html_file in html_files:
+            total_count += 1
+            success_count += self.process_html_file(html_file)
+        return success_count, total_count
+
     def get_stats(self) -> Dict[str, int]:
         """获取处理统计信息"""
         return self.stats.copy()
 
 
+def _process_file_worker(localizer: LinkLocalizer, file_path: Path) -> Tuple[bool, Dict[str, int]]:
+    """进程池工作函数：处理单个文件，返回是否成功及该文件产生的统计增量"""
+    localizer.stats = dict.fromkeys(localizer.stats, 0)
+    success = localizer.process_html_file(file_path)
+    return success, localizer.stats
+
+
 # 便捷函数
 def localize_all_links(trans_dir: str = None) -> Dict[str, int]:
     """
@@ -454,10 +496,14 @@ async def process_all_pages():
 async def main():
     """主函数"""
     from config.logging_config import setup_logging
+    from config.settings import config
 
     # 设置日志
     setup_logging('INFO')
 
+    # 单独运行时不经过main.py的组件初始化，需要自行创建输出目录
+    config.ensure_dirs()
+
     print("链接本地化工具 - 批量处理模式")
     print("=" * 50)
 
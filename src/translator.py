@@ -6,29 +6,130 @@ HTML翻译模块
 项目：系列技术文章翻译
 """
 
+import asyncio
+import functools
 import logging
 import time
-import json
-import sys
 import re
+from enum import IntEnum
+from html import escape as html_escape
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List
-from pydantic import BaseModel, Field
-from bs4 import BeautifulSoup, NavigableString, Comment
-
-from gemini_api import GeminiAPI
-from config.settings import OUTPUT_DIR, TRANS_DIR
-
-
-class TranslationResponse(BaseModel):
-    """翻译响应的结构化模型"""
-    translated_html: str = Field(description="翻译后的完整HTML内容，保持原格式不变")
-
-
-class MetadataTranslationResponse(BaseModel):
-    """元数据翻译响应的结构化模型"""
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, Optional, Tuple, List, Union
+from pydantic import BaseModel, ConfigDict, Field
+from bs4 import BeautifulSoup, Comment, Tag
+from bs4.builder import builder_registry
+import aiofiles
+
+from config.settings import TRANS_DIR, BATCH_SIZE
+
+if TYPE_CHECKING:
+    # Gemini SDK导入较慢，只在真正创建客户端时才导入
+    from gemini_api import GeminiAPI
+
+
+# 专业术语词典，只读以免运行中被修改导致提示词前缀变化
+_TERMINOLOGY = MappingProxyType({
+    "TPU": "TPU",
+    "TensorCore": "TensorCore",
+    "systolic array": "脉动阵列",
+    "matrix multiplication": "矩阵乘法",
+    "HBM": "HBM",
+    "bandwidth": "带宽",
+    "FLOPs": "FLOPs",
+    "bfloat16": "bfloat16",
+    "int8": "int8",
+    "MXU": "MXU",
+    "VPU": "VPU",
+    "VMEM": "VMEM",
+    "ICI": "ICI",
+    "PCIe": "PCIe",
+    "DCN": "DCN",
+    "roofline": "屋顶线",
+    "sharding": "分片",
+    "JAX": "JAX",
+    "scaling": "扩展",
+    "inference": "推理",
+    "training": "训练",
+    "transformer": "Transformer",
+    "attention": "注意力",
+    "GPU": "GPU",
+    "CUDA": "CUDA",
+    "parallelism": "并行性",
+    "Footnotes": "脚注",
+    "References": "参考文献",
+    "Citation": "引用",
+    "Authors": "作者",
+    "Published": "发布日期",
+    "Contents": "目录"
+})
+
+# 文档开头的DOCTYPE声明
+_DOCTYPE_RE = re.compile(r'\s*(<!DOCTYPE[^>]*>)', re.IGNORECASE)
+
+# 模型输出开头的多余文本行（如单独的"html"）及其后的DOCTYPE声明，一次匹配完成检查
+_HTML_PREFIX_RE = re.compile(
+    r'(?P<junk_line>[ \t]*(?P<junk>[^<\s][^\n]*)(?:\n|$))?(?P<doctype>\s*<!DOCTYPE[^>]*>)?',
+    re.IGNORECASE
+)
+
+# html标签的lang属性
+_LANG_RE = re.compile(r'lang="[^"]*"')
+
+# 数学内容占位符标签，如 <span data-math-placeholder="MATH_PLACEHOLDER_000">MATH_PLACEHOLDER_000</span>
+_MATH_PLACEHOLDER_RE = re.compile(
+    r'<span\b[^>]*?\bdata-math-placeholder=(["\'])(MATH_PLACEHOLDER_\d+)\1[^>]*>\s*\2\s*</span>'
+)
+
+# 发送给模型前保留的属性（链接、资源及需要翻译的文字说明），其余属性暂存后在翻译完成后恢复
+_KEPT_ATTRS = frozenset({'href', 'src', 'alt', 'title', 'data-math-placeholder'})
+
+# 暂存属性的标签上注入的编号，如 data-tid="12"
+_ATTR_TID_RE = re.compile(r'\sdata-tid=(["\'])(\d+)\1')
+
+# 长文档的body按块级元素切分后并发翻译：单块的最小字符数、最多切分的块数及同时翻译的块数
+_CHUNK_MIN_CHARS = 30000
+_MAX_BODY_CHUNKS = 6
+_MAX_CONCURRENT_CHUNKS = 4
+
+# 同一翻译请求中被保留片段隔开的各段之间的分隔符；body中的注释已被清除，不会与原文冲突
+_CHUNK_SEPARATOR = '<!--chunk-break-->'
+
+# 切分时可以展开、分别翻译其子元素的容器标签
+_SPLITTABLE_TAGS = frozenset({'body', 'div', 'section', 'article', 'main', 'd-article'})
+
+
+# 所有解析共用同一个lxml树构建器，批量翻译时不必为每次解析查找并新建构建器。
+# 解析本身是同步的，事件循环中的并发翻译不会同时使用它
+_LXML_BUILDER = builder_registry.lookup('lxml')()
+
+
+def _parse_html(markup: str) -> BeautifulSoup:
+    """使用共享的lxml构建器解析HTML"""
+    return BeautifulSoup(markup, builder=_LXML_BUILDER)
+
+
+def _serialize_body(soup: BeautifulSoup) -> str:
+    """
+    序列化由body片段解析出的文档
+
+    lxml解析器会为片段补全<html>外层，只取回body部分以免组装时出现嵌套的html标签。
+    """
+    return str(soup.body) if soup.body else str(soup)
+
+
+class TranslationStatus(IntEnum):
+    """单个文件的翻译结果状态"""
+    FAILED = 0
+    SUCCESS = 1
+    SKIPPED = 2
+
+
+class FullTranslationResponse(BaseModel):
+    """翻译响应的结构化模型，一次请求同时返回元数据和正文的翻译"""
     translated_title: str = Field(description="翻译后的页面标题")
     translated_description: str = Field(description="翻译后的页面描述")
+    translated_html: str = Field(description="翻译后的完整HTML内容，保持原格式不变")
 
 
 class HTMLParts(BaseModel):
@@ -39,97 +140,77 @@ class HTMLParts(BaseModel):
     original_description: str = Field(description="原始页面描述")
     html_attrs: str = Field(description="html标签的属性")
     doctype: str = Field(description="文档类型声明")
+    soup: Optional[BeautifulSoup] = Field(default=None, exclude=True,
+                                          description="解析后的完整文档，供清理和组装步骤直接复用，无需重复解析")
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
 
 class HTMLTranslator:
     """HTML翻译器，使用Gemini API进行智能翻译"""
 
-    def __init__(self):
-        """初始化翻译器"""
+    def __init__(self, gemini_api: Optional['GeminiAPI'] = None):
+        """
+        初始化翻译器
+
+        Args:
+            gemini_api (Optional[GeminiAPI]): 共享的Gemini API实例，未提供时新建一个。
+                多个翻译器共享同一实例可以复用底层HTTP连接池
+        """
         self.logger = logging.getLogger(__name__)
 
         # 初始化Gemini API
-        try:
-            self.gemini_api = GeminiAPI()
-            self.logger.info("Gemini API初始化成功")
-        except Exception as e:
-            self.logger.error(f"Gemini API初始化失败: {str(e)}")
-            raise
+        if gemini_api is not None:
+            self.gemini_api = gemini_api
+        else:
+            try:
+                from gemini_api import GeminiAPI
+                self.gemini_api = GeminiAPI()
+                self.logger.info("Gemini API初始化成功")
+            except Exception as e:
+                self.logger.error(f"Gemini API初始化失败: {str(e)}")
+                raise
 
         # 确保输出目录存在
         Path(TRANS_DIR).mkdir(parents=True, exist_ok=True)
 
-        # 数学内容存储（用于占位符机制）
-        self.math_content_store: Dict[str, str] = {}
-
-        # 专业术语词典
-        self.terminology = {
-            "TPU": "TPU",
-            "TensorCore": "TensorCore",
-            "systolic array": "脉动阵列",
-            "matrix multiplication": "矩阵乘法",
-            "HBM": "HBM",
-            "bandwidth": "带宽",
-            "FLOPs": "FLOPs",
-            "bfloat16": "bfloat16",
-            "int8": "int8",
-            "MXU": "MXU",
-            "VPU": "VPU",
-            "VMEM": "VMEM",
-            "ICI": "ICI",
-            "PCIe": "PCIe",
-            "DCN": "DCN",
-            "roofline": "屋顶线",
-            "sharding": "分片",
-            "JAX": "JAX",
-            "scaling": "扩展",
-            "inference": "推理",
-            "training": "训练",
-            "transformer": "Transformer",
-            "attention": "注意力",
-            "GPU": "GPU",
-            "CUDA": "CUDA",
-            "parallelism": "并行性",
-            "Footnotes": "脚注",
-            "References": "参考文献",
-            "Citation": "引用",
-            "Authors": "作者",
-            "Published": "发布日期",
-            "Contents": "目录"
-        }
+        # 专业术语词典（只读），及其在提示词中的文本形式
+        self.terminology = _TERMINOLOGY
+        self._terminology_block = "\n".join(f"- {en}: {zh}" for en, zh in self.terminology.items())
+
+        # 提示词中与文档无关的固定前缀（角色、术语表、翻译要求）只构建一次。
+        # 前缀放在最前面且所有文件逐字节一致，便于命中Gemini的隐式上下文缓存
+        self._prompt_prefix = self._build_prompt_prefix()
 
         self.logger.info("HTML翻译器初始化完成")
 
-    def extract_html_parts(self, html_content: str) -> HTMLParts:
+    def extract_html_parts(self, html_content: str, serialize_body: bool = True) -> HTMLParts:
         """
         提取HTML的各个部分
 
         Args:
             html_content (str): 完整的HTML内容
+            serialize_body (bool): 是否序列化body。调用方随后会原地清理并序列化body时传False，
+                此时body_content为空字符串，body只在清理后序列化一次
 
         Returns:
             HTMLParts: 分离后的HTML各部分
         """
         try:
-            # 解析HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-
-            # 提取doctype
-            doctype = "<!DOCTYPE html>"  # 默认HTML5 DOCTYPE
-            for item in soup.contents:
-                if hasattr(item, 'name') and item.name is None:
-                    doctype_str = str(item).strip()
-                    if doctype_str.upper().startswith('<!DOCTYPE'):
-                        doctype = doctype_str
-                        break
+            # 提取doctype（解析后的Doctype节点不含尖括号，直接从原文匹配）
+            doctype_match = _DOCTYPE_RE.match(html_content)
+            doctype = doctype_match.group(1) if doctype_match else "<!DOCTYPE html>"  # 默认HTML5 DOCTYPE
+
+            # 解析HTML（body需要完整保留以供翻译，因此仍解析整个文档）
+            soup = _parse_html(html_content)
 
             # 获取html标签属性
             html_tag = soup.find('html')
             html_attrs = ""
             if html_tag and html_tag.attrs:
-                attrs_list = [f'{k}="{v}"' if isinstance(v, str) else f'{k}="{" ".join(v)}"'
-                             for k, v in html_tag.attrs.items()]
-                html_attrs = " " + " ".join(attrs_list)
+                # 用同属性的空html标签交给BeautifulSoup序列化，属性值的转义、引号和多值属性都由其处理
+                empty_html_tag = soup.new_tag('html', attrs=html_tag.attrs)
+                html_attrs = empty_html_tag.decode()[len('<html'):-len('></html>')]
 
             # 提取head内容
             head_tag = soup.find('head')
@@ -137,14 +218,20 @@ class HTMLTranslator:
 
             # 提取body内容
             body_tag = soup.find('body')
-            body_content = str(body_tag) if body_tag else "<body></body>"
+            if not body_tag:
+                body_content = "<body></body>"
+            else:
+                body_content = str(body_tag) if serialize_body else ""
+
+            # 标题和描述只在head中查找，找不到时不必遍历整个body（也避免误取SVG中的title）
+            metadata_root = head_tag or soup
 
             # 提取标题
-            title_tag = soup.find('title')
+            title_tag = metadata_root.find('title')
             original_title = title_tag.get_text() if title_tag else ""
 
             # 提取描述
-            desc_tag = soup.find('meta', attrs={'name': 'description'})
+            desc_tag = metadata_root.find('meta', attrs={'name': 'description'})
             original_description = desc_tag.get('content', '') if desc_tag else ""
 
             parts = HTMLParts(
@@ -153,7 +240,8 @@ class HTMLTranslator:
                 original_title=original_title,
                 original_description=original_description,
                 html_attrs=html_attrs,
-                doctype=doctype
+                doctype=doctype,
+                soup=soup
             )
 
             return parts
@@ -162,32 +250,63 @@ class HTMLTranslator:
             self.logger.error(f"HTML解析失败: {str(e)}")
             raise
 
-    def _clean_body_for_translation(self, body_content: str) -> str:
+    def _prepare_html(self, html_content: str) -> Tuple[HTMLParts, str, Dict[str, str], Dict[str, str]]:
+        """
+        一次完成提取和清理：定位head/body后直接在解析好的body上移除注释、替换数学公式，
+        body只在清理完成后序列化一次，不再先序列化原始body再重新解析
+
+        Args:
+            html_content (str): 完整的HTML内容
+
+        Returns:
+            Tuple[HTMLParts, str, Dict[str, str], Dict[str, str]]:
+                (HTML各部分, 清理后的body内容, 占位符到原始数学内容的映射, 编号到暂存属性的映射)
+        """
+        parts = self.extract_html_parts(html_content, serialize_body=False)
+        if parts.soup is not None and parts.soup.body:
+            cleaned_body, math_store, attr_store = self._clean_body_for_translation(parts.soup)
+        else:
+            cleaned_body, math_store, attr_store = self._clean_body_for_translation(parts.body_content)
+        return parts, cleaned_body, math_store, attr_store
+
+    def _clean_body_for_translation(self, body_content: Union[str, BeautifulSoup]
+                                    ) -> Tuple[str, Dict[str, str], Dict[str, str]]:
         """
         清理body内容，移除不需要翻译的部分，并使用占位符替换数学内容
 
+        class、style、id、data-*等不需要翻译的属性也先移除，只在标签上留下data-tid编号，
+        模型无需原样复述这些属性，输入和输出的token都随之减少。
+        占位符、属性与原始内容的对应关系随结果返回而不保存在实例上，
+        同一个翻译器可以安全地并发翻译多个文档。
+
         Args:
-            body_content (str): 原始body内容
+            body_content (Union[str, BeautifulSoup]): 原始body内容，或已解析的完整文档
+                （此时直接在文档的body上原地修改，不再重新解析）
 
         Returns:
-            str: 清理后的body内容
+            Tuple[str, Dict[str, str], Dict[str, str]]:
+                (清理后的body内容, 占位符到原始数学内容的映射, 编号到暂存属性的映射)
         """
+        math_store: Dict[str, str] = {}
+        attr_store: Dict[str, str] = {}
+
         try:
-            soup = BeautifulSoup(body_content, 'html.parser')
+            if isinstance(body_content, BeautifulSoup):
+                soup = body_content
+            else:
+                soup = _parse_html(body_content)
+            body = soup.body or soup
 
             # 移除注释
-            for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+            for comment in body.find_all(string=lambda text: isinstance(text, Comment)):
                 comment.extract()
 
-            # 清空数学内容存储，开始新的翻译任务
-            self.math_content_store.clear()
-
             # 提取并替换 <mjx-container> 标签
-            mjx_containers = soup.find_all('mjx-container')
+            mjx_containers = body.find_all('mjx-container')
             for i, container in enumerate(mjx_containers):
                 placeholder = f"MATH_PLACEHOLDER_{i:03d}"
-                # 保存完整的标签内容
-                self.math_content_store[placeholder] = str(container)
+                # 保存完整的标签内容（直接调用decode序列化，恢复时按原文拼回，无需重新解析）
+                math_store[placeholder] = container.decode()
                 # 创建占位符标签
                 placeholder_tag = soup.new_tag('span', **{'data-math-placeholder': placeholder})
                 placeholder_tag.string = placeholder
@@ -196,103 +315,95 @@ class HTMLTranslator:
 
             self.logger.info(f"提取了 {len(mjx_containers)} 个数学公式标签")
 
-            return str(soup)
-
-        except Exception as e:
-            self.logger.error(f"内容清理失败: {str(e)}")
-            return body_content
-
-    def _translate_metadata(self, title: str, description: str) -> Optional[Dict[str, str]]:
-        """
-        翻译页面标题和描述
-
-        Args:
-            title (str): 原始标题
-            description (str): 原始描述
-
-        Returns:
-            Optional[Dict[str, str]]: 翻译后的标题和描述
-        """
-        if not title and not description:
-            return None
-
-        try:
-            terminology_list = "\n".join([f"- {en}: {zh}" for en, zh in self.terminology.items()])
-
-            prompt = f"""你是一个专业的技术文档翻译专家，请翻译以下页面元数据：
-
-专业术语对照表：
-{terminology_list}
-
-翻译要求：
-1. 保持技术术语的一致性
-2. 标题要简洁明了，符合中文习惯
-3. 描述要准确传达原文含义，保持专业性
-
-原始标题: {title}
-原始描述: {description}
-
-请只返回翻译后的标题和描述，不要添加任何解释。"""
+            # 暂存不需要翻译的属性，按编号序列化为属性文本，恢复时直接按原文拼回
+            for tag in body.find_all(True):
+                removed = [name for name in tag.attrs if name not in _KEPT_ATTRS]
+                if not removed:
+                    continue
+                tid = str(len(attr_store))
+                attr_store[tid] = " ".join(
+                    f'{name}="{html_escape(" ".join(value) if isinstance(value, list) else value)}"'
+                    for name, value in ((name, tag.attrs.pop(name)) for name in removed)
+                )
+                tag['data-tid'] = tid
 
-            response = self.gemini_api.generate_structured_content(
-                prompt=prompt,
-                response_schema=MetadataTranslationResponse
-            )
+            self.logger.info(f"暂存了 {len(attr_store)} 个标签的属性")
 
-            if response:
-                return {
-                    'title': response.translated_title,
-                    'description': response.translated_description
-                }
-            else:
-                return None
+            return _serialize_body(soup), math_store, attr_store
 
         except Exception as e:
-            self.logger.error(f"元数据翻译失败: {str(e)}")
-            return None
+            self.logger.error(f"内容清理失败: {str(e)}")
+            if isinstance(body_content, BeautifulSoup):
+                body_content = _serialize_body(body_content)
+            return body_content, {}, {}
 
-    def _restore_math_content(self, translated_html: str) -> str:
+    def _restore_body(self, translated_html: str, math_store: Dict[str, str],
+                      attr_store: Optional[Dict[str, str]] = None) -> str:
         """
-        将占位符替换回原始的数学内容
+        将暂存的属性和数学内容恢复到翻译后的body中
 
         Args:
-            translated_html (str): 包含占位符的翻译后HTML
+            translated_html (str): 包含占位符和data-tid编号的翻译后HTML
+            math_store (Dict[str, str]): 清理body时得到的占位符到原始数学内容的映射
+            attr_store (Optional[Dict[str, str]]): 清理body时得到的编号到暂存属性的映射
 
         Returns:
-            str: 恢复数学内容后的HTML
+            str: 恢复属性和数学内容后的HTML
         """
         try:
-            if not self.math_content_store:
-                return translated_html
-
-            soup = BeautifulSoup(translated_html, 'html.parser')
-
-            # 查找所有占位符标签
-            placeholders = soup.find_all('span', attrs={'data-math-placeholder': True})
-            restored_count = 0
-
-            for placeholder_tag in placeholders:
-                placeholder_key = placeholder_tag.get('data-math-placeholder')
-                if placeholder_key in self.math_content_store:
-                    # 获取原始数学内容
-                    original_math = self.math_content_store[placeholder_key]
-                    # 解析原始数学标签
-                    math_soup = BeautifulSoup(original_math, 'html.parser')
-                    math_tag = math_soup.find('mjx-container')
-                    if math_tag:
-                        # 替换占位符
-                        placeholder_tag.replace_with(math_tag)
-                        restored_count += 1
-
-            self.logger.info(f"恢复了 {restored_count} 个数学公式标签")
-            return str(soup)
+            restored_html = translated_html
+
+            # 编号和占位符标签都由我们自己生成，直接按文本替换，无需解析整个文档；
+            # 正则同时兼容模型调整属性顺序、引号或在标签内加入空白的情况
+            if attr_store:
+                restored_tids = set()
+                unknown_tids = set()
+
+                def restore_attrs(match):
+                    tid = match.group(2)
+                    original_attrs = attr_store.get(tid)
+                    if original_attrs is None:
+                        unknown_tids.add(tid)
+                        return match.group(0)
+                    restored_tids.add(tid)
+                    return " " + original_attrs
+
+                restored_html = _ATTR_TID_RE.sub(restore_attrs, restored_html)
+                self.logger.info(f"恢复了 {len(restored_tids)}/{len(attr_store)} 个标签的属性")
+
+                # 模型丢失或改动了data-tid时，对应标签的class、style等属性无法恢复，明确提示以便重新翻译
+                missing_count = len(attr_store) - len(restored_tids)
+                if missing_count or unknown_tids:
+                    missing_sample = sorted(set(attr_store) - restored_tids, key=int)[:10]
+                    self.logger.warning(
+                        f"有 {missing_count} 个标签的属性未能恢复（缺失编号示例: {missing_sample}），"
+                        f"另有 {len(unknown_tids)} 个无法识别的data-tid，译文部分样式可能丢失"
+                    )
+
+            if math_store:
+                restored_count = 0
+
+                def restore_math(match):
+                    nonlocal restored_count
+                    original_math = math_store.get(match.group(2))
+                    if original_math is None:
+                        return match.group(0)
+                    restored_count += 1
+                    return original_math
+
+                restored_html = _MATH_PLACEHOLDER_RE.sub(restore_math, restored_html)
+                self.logger.info(f"恢复了 {restored_count} 个数学公式标签")
+
+            return restored_html
 
         except Exception as e:
-            self.logger.error(f"恢复数学内容失败: {str(e)}")
+            self.logger.error(f"恢复body内容失败: {str(e)}")
             return translated_html
 
     def reassemble_html(self, parts: HTMLParts, translated_body: str,
-                       translated_title: str = "", translated_description: str = "") -> str:
+                       translated_title: str = "", translated_description: str = "",
+                       math_store: Optional[Dict[str, str]] = None,
+                       attr_store: Optional[Dict[str, str]] = None) -> str:
         """
         重新组装HTML
 
@@ -301,20 +412,24 @@ class HTMLTranslator:
             translated_body (str): 翻译后的body内容
             translated_title (str): 翻译后的标题
             translated_description (str): 翻译后的描述
+            math_store (Optional[Dict[str, str]]): 占位符到原始数学内容的映射
+            attr_store (Optional[Dict[str, str]]): 编号到暂存属性的映射
 
         Returns:
             str: 完整的翻译后HTML
         """
         try:
-            # 首先恢复数学内容
-            translated_body_with_math = self._restore_math_content(translated_body)
+            # 首先恢复暂存的属性和数学内容
+            translated_body_with_math = self._restore_body(translated_body, math_store or {}, attr_store)
 
-            # 解析head内容以更新标题和描述
-            head_soup = BeautifulSoup(parts.head_content, 'html.parser')
+            # 直接复用提取阶段解析好的文档更新标题和描述，没有时才重新解析head
+            head_soup = parts.soup
+            if head_soup is None or head_soup.head is None:
+                head_soup = _parse_html(parts.head_content)
 
             # 更新标题
             if translated_title:
-                title_tag = head_soup.find('title')
+                title_tag = head_soup.head.find('title') if head_soup.head else None
                 if title_tag:
                     title_tag.string = translated_title
                 else:
@@ -326,7 +441,7 @@ class HTMLTranslator:
 
             # 更新描述
             if translated_description:
-                desc_tag = head_soup.find('meta', attrs={'name': 'description'})
+                desc_tag = head_soup.head.find('meta', attrs={'name': 'description'}) if head_soup.head else None
                 if desc_tag:
                     desc_tag['content'] = translated_description
                 else:
@@ -338,7 +453,7 @@ class HTMLTranslator:
             # 更新语言属性
             html_attrs_updated = parts.html_attrs
             if 'lang=' in html_attrs_updated:
-                html_attrs_updated = re.sub(r'lang="[^"]*"', 'lang="zh-CN"', html_attrs_updated)
+                html_attrs_updated = _LANG_RE.sub('lang="zh-CN"', html_attrs_updated)
             elif html_attrs_updated:
                 html_attrs_updated += ' lang="zh-CN"'
             else:
@@ -380,59 +495,46 @@ class HTMLTranslator:
             str: 修复后的HTML内容
         """
         try:
-            lines = html_content.split('\n')
-            fixed_lines = []
-            has_doctype = False
+            # 多余文本只可能出现在第一行，DOCTYPE也只需检查文档开头，一次正则匹配即可
+            match = _HTML_PREFIX_RE.match(html_content)
 
-            for i, line in enumerate(lines):
+            junk = match.group('junk')
+            if junk is not None:
+                junk = junk.strip()
                 # 检查第一行是否只包含"html"文本
-                if i == 0 and line.strip().lower() == 'html':
+                if junk.lower() == 'html':
                     self.logger.warning("检测到HTML开头多余的'html'文本，已移除")
-                    continue
-                # 检查是否有其他类似的多余文本
-                elif i == 0 and line.strip() and not line.strip().startswith('<!DOCTYPE'):
-                    # 如果第一行不是DOCTYPE声明，检查是否是多余的文本
-                    if not line.strip().startswith('<'):
-                        self.logger.warning(f"检测到HTML开头多余文本: '{line.strip()}'，已移除")
-                        continue
-
-                # 检查是否有DOCTYPE声明
-                if line.strip().upper().startswith('<!DOCTYPE'):
-                    has_doctype = True
-
-                fixed_lines.append(line)
+                # 其他类似的多余文本
+                else:
+                    self.logger.warning(f"检测到HTML开头多余文本: '{junk}'，已移除")
+                html_content = html_content[match.end('junk_line'):]
 
             # 如果没有DOCTYPE声明，添加一个
-            if not has_doctype:
+            if match.group('doctype') is None:
                 self.logger.warning("检测到缺少DOCTYPE声明，已添加")
-                fixed_lines.insert(0, '<!DOCTYPE html>')
+                html_content = '<!DOCTYPE html>\n' + html_content
 
-            return '\n'.join(fixed_lines)
+            return html_content
 
         except Exception as e:
             self.logger.error(f"修复HTML前缀失败: {str(e)}")
             return html_content
 
-    def _build_translation_prompt(self, html_content: str) -> str:
+    def _build_prompt_prefix(self) -> str:
         """
-        构建翻译提示词
-
-        Args:
-            html_content (str): 要翻译的HTML内容
+        构建翻译提示词的固定前缀
 
         Returns:
-            str: 构建好的提示词
+            str: 不含任何文档内容的提示词前缀
         """
-        terminology_list = "\n".join([f"- {en}: {zh}" for en, zh in self.terminology.items()])
-
-        prompt = f"""你是一个专业的技术文档翻译专家，专门翻译机器学习和深度学习相关的技术文章。
+        return f"""你是一个专业的技术文档翻译专家，专门翻译机器学习和深度学习相关的技术文章。
 
 请将以下HTML内容从英文翻译成中文，要求：
 
-1. **格式保持**：完全保持原HTML结构、标签、属性、CSS类名、ID等不变
+1. **格式保持**：完全保持原HTML结构、标签、属性不变，data-tid属性必须原样保留在原标签上
 2. **内容翻译**：只翻译HTML标签内的文本内容，不翻译HTML标签本身
 3. **术语一致性**：使用以下专业术语对照表保持翻译一致性：
-{terminology_list}
+{self._terminology_block}
 
 4. **翻译质量**：
    - 准确传达原文技术含义
@@ -441,27 +543,49 @@ class HTMLTranslator:
    - 数学公式、代码片段、URL链接保持不变
 
 5. **特殊处理**：
-   - HTML注释不翻译
+   - HTML注释不翻译，分隔注释 {_CHUNK_SEPARATOR} 必须原样保留，不得增删
    - JavaScript代码不翻译
    - CSS样式不翻译
    - 属性值不翻译（如class名、id等）
    - 锚点链接（#开头）不翻译
    - 数学公式占位符（MATH_PLACEHOLDER_XXX）不翻译，保持原样
 
-请只返回翻译后的完整HTML内容，不要添加任何解释或额外信息。
+6. **页面元数据**：同时翻译文末给出的原始页面标题和描述
+   - 标题要简洁明了，符合中文习惯
+   - 描述要准确传达原文含义，保持专业性
+   - 原文为空的项返回空字符串
 
-原HTML内容：
-{html_content}"""
+请只返回翻译后的标题、描述和完整HTML内容，不要添加任何解释或额外信息。"""
 
-        return prompt
+    def _build_translation_prompt(self, html_content: str, title: str = "", description: str = "") -> str:
+        """
+        构建翻译提示词（同时要求翻译页面标题和描述）
 
-    async def _translate_body_content(self, body_content: str, context: str = "") -> Optional[Dict]:
+        Args:
+            html_content (str): 要翻译的HTML内容
+            title (str): 原始页面标题
+            description (str): 原始页面描述
+
+        Returns:
+            str: 构建好的提示词
         """
-        翻译body内容（内部方法）
+        return (
+            f"{self._prompt_prefix}\n\n"
+            f"原始标题: {title}\n"
+            f"原始描述: {description}\n\n"
+            f"原HTML内容：\n{html_content}"
+        )
+
+    async def _translate_body_content(self, body_content: str, context: str = "",
+                                      title: str = "", description: str = "") -> Optional[Dict]:
+        """
+        翻译body内容及页面元数据（内部方法，一次API请求完成）
 
         Args:
             body_content (str): 要翻译的body内容
             context (str): 翻译上下文（可选）
+            title (str): 原始页面标题
+            description (str): 原始页面描述
 
         Returns:
             Optional[Dict]: 翻译结果字典，失败时返回None
@@ -471,24 +595,32 @@ class HTMLTranslator:
 
         try:
             # 构建翻译提示词
-            prompt = self._build_translation_prompt(body_content)
+            prompt = self._build_translation_prompt(body_content, title, description)
 
             # 调用Gemini API进行结构化翻译
+            # 使用SDK原生的异步流式接口，多个文件和分块并发翻译时无需为每个请求占用一个线程；
+            # 并发时关闭流式进度输出，避免多个响应在终端中交错
             start_time = time.time()
 
-            response = self.gemini_api.generate_structured_content_with_stream(
+            response = await self.gemini_api.agenerate_structured_content_with_stream(
                 prompt=prompt,
-                response_schema=TranslationResponse
+                response_schema=FullTranslationResponse,
+                show_progress=False,
+                raw_json=True
             )
 
             translation_time = time.time() - start_time
 
-            if response and response.translated_html:
+            # 模型只作为输出格式约束，响应直接按字典取字段，不再经过Pydantic校验
+            translated_html = response.get('translated_html') if response else None
+            if translated_html:
                 translation_result = {
                     'original_html': body_content,
-                    'translated_html': response.translated_html,
+                    'translated_html': translated_html,
+                    'translated_title': (response.get('translated_title') or "") if title else "",
+                    'translated_description': (response.get('translated_description') or "") if description else "",
                     'original_length': len(body_content),
-                    'translated_length': len(response.translated_html),
+                    'translated_length': len(translated_html),
                     'translation_time': translation_time,
                     'success': True,
                     'timestamp': time.time(),
@@ -503,6 +635,146 @@ class HTMLTranslator:
             self.logger.error(f"翻译失败: {str(e)}")
             return None
 
+    @staticmethod
+    def _split_body_into_chunks(body_tag: Tag, max_chunks: int = _MAX_BODY_CHUNKS) -> List[Tuple[str, Optional[int]]]:
+        """
+        按块级元素边界把body切分成若干片段，并把片段分配到至多max_chunks个翻译请求
+
+        过大的容器（如包裹全文的 <div class="post distill">）会被展开，只有一个子元素的容器也会
+        逐层展开；容器的开始和结束标签、脚本和样式原样保留，不发给模型。待翻译的片段按文档顺序
+        贪心地分配到请求中，被保留片段隔开的片段也可以落在同一请求里（请求内用 _CHUNK_SEPARATOR
+        分隔），因此零碎的小片段不会单独发起请求。请求数超过max_chunks时，反复合并相邻且合计
+        最小的两个请求。
+
+        Args:
+            body_tag (Tag): 清理后的body标签
+            max_chunks (int): 最多的翻译请求数
+
+        Returns:
+            List[Tuple[str, Optional[int]]]: 按原顺序排列的 (HTML片段, 所属请求序号)，
+                不需要翻译的片段序号为None，全部片段拼接后即为完整的body
+        """
+        total_size = len(body_tag.decode())
+        target_size = max(_CHUNK_MIN_CHARS, -(-total_size // max_chunks))
+
+        # 展开过大的容器，得到按文档顺序排列的 (片段, 是否需要翻译)
+        pieces: List[Tuple[str, bool]] = []
+
+        def walk(node):
+            # 文本节点用output_ready()序列化，保留&lt;、&amp;等实体；str()会把它们还原成裸字符
+            html = node.decode() if isinstance(node, Tag) else node.output_ready()
+            # 脚本和样式无需翻译，原样保留
+            if isinstance(node, Tag) and node.name in ('script', 'style'):
+                pieces.append((html, False))
+                return
+
+            if len(html) <= target_size or node.name not in _SPLITTABLE_TAGS or \
+                    not any(isinstance(child, Tag) for child in node.children):
+                pieces.append((html, True))
+                return
+
+            # 空壳标签的序列化结果即为开始标签加结束标签
+            close_tag = f"</{node.name}>"
+            open_tag = Tag(name=node.name, attrs=node.attrs).decode()[:-len(close_tag)]
+            pieces.append((open_tag, False))
+            for child in node.children:
+                walk(child)
+            pieces.append((close_tag, False))
+
+        walk(body_tag)
+
+        # 待翻译的片段按顺序贪心地分配请求；只含空白的片段跟随紧邻的前一个片段，否则原样保留
+        labels: List[Optional[int]] = []
+        sizes: List[int] = []
+        for html, translatable in pieces:
+            if not translatable or not html.strip():
+                labels.append(labels[-1] if translatable and labels else None)
+                continue
+            if not sizes or sizes[-1] + len(html) > target_size:
+                sizes.append(0)
+            sizes[-1] += len(html)
+            labels.append(len(sizes) - 1)
+
+        # 请求数不超过max_chunks：合并相邻且合计最小的两个请求
+        while len(sizes) > max_chunks:
+            merge_at = min(range(len(sizes) - 1), key=lambda i: sizes[i] + sizes[i + 1])
+            sizes[merge_at:merge_at + 2] = [sizes[merge_at] + sizes[merge_at + 1]]
+            labels = [label - 1 if label is not None and label > merge_at else label for label in labels]
+
+        # 相邻且属于同一请求的片段直接拼接
+        chunks: List[Tuple[List[str], Optional[int]]] = []
+        for (html, _), label in zip(pieces, labels):
+            if chunks and label is not None and chunks[-1][1] == label:
+                chunks[-1][0].append(html)
+            else:
+                chunks.append(([html], label))
+
+        return [(''.join(parts), label) for parts, label in chunks]
+
+    async def _translate_body_in_chunks(self, chunks: List[Tuple[str, Optional[int]]], context: str = "",
+                                        title: str = "", description: str = "") -> Optional[Dict]:
+        """
+        并发翻译切分后的body片段并按原顺序拼接
+
+        同一请求中的片段用 _CHUNK_SEPARATOR 连接后一起翻译，译文再按分隔符拆回原位置。
+        页面元数据随第一个请求一起翻译；任一请求失败则整体失败。
+
+        Args:
+            chunks (List[Tuple[str, Optional[int]]]): _split_body_into_chunks 的结果
+            context (str): 翻译上下文（可选）
+            title (str): 原始页面标题
+            description (str): 原始页面描述
+
+        Returns:
+            Optional[Dict]: 与 _translate_body_content 格式相同的翻译结果字典，失败时返回None
+        """
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_CHUNKS)
+        requests: Dict[int, List[int]] = {}
+        for index, (_, label) in enumerate(chunks):
+            if label is not None:
+                requests.setdefault(label, []).append(index)
+        start_time = time.time()
+
+        async def _one(label: int) -> Optional[Dict]:
+            # 只有第一个请求携带标题和描述
+            is_first = label == 0
+            async with semaphore:
+                return await self._translate_body_content(
+                    _CHUNK_SEPARATOR.join(chunks[i][0] for i in requests[label]),
+                    f"{context} 第{label + 1}/{len(requests)}块",
+                    title if is_first else "",
+                    description if is_first else ""
+                )
+
+        results = await asyncio.gather(*(_one(label) for label in range(len(requests))))
+        if not all(results):
+            return None
+
+        translated: Dict[int, str] = {}
+        for label, result in enumerate(results):
+            parts = result['translated_html'].split(_CHUNK_SEPARATOR)
+            if len(parts) != len(requests[label]):
+                self.logger.error(f"第{label + 1}块译文中的分隔符数量不符: "
+                                  f"期望 {len(requests[label])} 段，实际 {len(parts)} 段")
+                return None
+            translated.update(zip(requests[label], parts))
+
+        translated_html = ''.join(translated.get(i, html) for i, (html, _) in enumerate(chunks))
+        original_html = ''.join(html for html, _ in chunks)
+
+        return {
+            'original_html': original_html,
+            'translated_html': translated_html,
+            'translated_title': results[0]['translated_title'],
+            'translated_description': results[0]['translated_description'],
+            'original_length': len(original_html),
+            'translated_length': len(translated_html),
+            'translation_time': time.time() - start_time,
+            'success': True,
+            'timestamp': time.time(),
+            'context': context
+        }
+
     async def translate_html(self, html_content: str, context: str = "") -> Optional[str]:
         """
         HTML翻译方法：分离head和body，只翻译必要内容，翻译元数据
@@ -521,38 +793,55 @@ class HTMLTranslator:
         start_time = time.time()
 
         try:
-            # 1. 提取HTML各部分
-            parts = self.extract_html_parts(html_content)
-
-            # 2. 翻译元数据（标题和描述）
-            translated_metadata = self._translate_metadata(
-                parts.original_title,
-                parts.original_description
-            )
-
-            translated_title = ""
-            translated_description = ""
-            if translated_metadata:
-                translated_title = translated_metadata.get('title', '')
-                translated_description = translated_metadata.get('description', '')
-
-            # 3. 清理并翻译body内容
-            cleaned_body = self._clean_body_for_translation(parts.body_content)
-            body_reduction = len(parts.body_content) - len(cleaned_body)
-
-            body_translation_result = await self._translate_body_content(cleaned_body, f"Body部分 - {context}")
+            # 1. 提取HTML各部分并清理body内容（同一次遍历，body只序列化一次）
+            parts, cleaned_body, math_store, attr_store = self._prepare_html(html_content)
+
+            # 原始body不再单独序列化，按原文中<body起始位置估算其长度，仅用于日志统计
+            body_start = html_content.find('<body')
+            original_body_chars = len(html_content) - body_start if body_start >= 0 else len(cleaned_body)
+            body_reduction = original_body_chars - len(cleaned_body)
+
+            # 2. 在同一次请求中翻译body和元数据（标题和描述）
+
+            # 长文档按块级元素切分后并发翻译，单次请求的延迟不再随文档长度线性增长
+            chunks = None
+            if len(cleaned_body) > _CHUNK_MIN_CHARS:
+                body_tag = parts.soup.body if parts.soup is not None and parts.soup.body else \
+                    _parse_html(cleaned_body).body
+                chunks = self._split_body_into_chunks(body_tag)
+
+            request_count = len({label for _, label in chunks if label is not None}) if chunks else 0
+            if request_count > 1:
+                self.logger.info(f"body切分为 {request_count} 块并发翻译")
+                body_translation_result = await self._translate_body_in_chunks(
+                    chunks,
+                    f"Body部分 - {context}",
+                    parts.original_title,
+                    parts.original_description
+                )
+            else:
+                body_translation_result = await self._translate_body_content(
+                    cleaned_body,
+                    f"Body部分 - {context}",
+                    parts.original_title,
+                    parts.original_description
+                )
 
             if not body_translation_result or not body_translation_result.get('success'):
                 return None
 
             translated_body = body_translation_result['translated_html']
+            translated_title = body_translation_result['translated_title']
+            translated_description = body_translation_result['translated_description']
 
-            # 4. 重新组装HTML
+            # 3. 重新组装HTML
             complete_translated_html = self.reassemble_html(
                 parts,
                 translated_body,
                 translated_title,
-                translated_description
+                translated_description,
+                math_store,
+                attr_store
             )
 
             translation_time = time.time() - start_time
@@ -570,11 +859,11 @@ class HTMLTranslator:
 
             file_path = trans_dir / filename
 
-            # 保存翻译后的HTML
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(complete_translated_html)
+            # 保存翻译后的HTML（异步写入，不阻塞其他文件的并发翻译）
+            async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+                await f.write(complete_translated_html)
 
-            self.logger.info(f"翻译完成: {filename} ({translation_time:.1f}s, 节省{body_reduction/len(parts.body_content)*100:.0f}%内容)")
+            self.logger.info(f"翻译完成: {filename} ({translation_time:.1f}s, 节省{body_reduction/max(original_body_chars, 1)*100:.0f}%内容)")
 
             return str(file_path)
 
@@ -601,14 +890,21 @@ class HTMLTranslator:
 
 
 # 便捷函数
+@functools.lru_cache(maxsize=1)
+def _get_default_translator() -> HTMLTranslator:
+    """获取便捷函数共用的翻译器，避免每次调用都重新创建Gemini API和翻译器"""
+    return HTMLTranslator()
+
+
 async def translate_html_content(html_content: str, context: str = "") -> Optional[str]:
     """便捷函数：翻译HTML内容，返回保存的文件路径"""
-    translator = HTMLTranslator()
+    translator = _get_default_translator()
     return await translator.translate_html(html_content, context)
 
 
-async def translate_html_file(input_file: str, force_translate: bool = False) -> Optional[str]:
-    """便捷函数：翻译HTML文件，使用原始文件名保存到output/trans目录"""
+async def translate_html_file(input_file: str, force_translate: bool = False,
+                              translator: Optional[HTMLTranslator] = None) -> TranslationStatus:
+    """便捷函数：翻译HTML文件，使用原始文件名保存到output/trans目录，可传入共享的翻译器"""
     try:
         input_path = Path(input_file)
         trans_dir = Path(TRANS_DIR)
@@ -617,21 +913,21 @@ async def translate_html_file(input_file: str, force_translate: bool = False) ->
         # 检查目标文件是否已存在
         if target_file.exists() and not force_translate:
             logging.getLogger(__name__).info(f"⏭️  跳过已翻译文件: {input_path.name}")
-            return str(target_file)
+            return TranslationStatus.SKIPPED
 
         # 读取输入文件
-        with open(input_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        async with aiofiles.open(input_file, 'r', encoding='utf-8') as f:
+            html_content = await f.read()
 
-        # 翻译内容并保存
-        translator = HTMLTranslator()
-        saved_path = await translator.translate_html(html_content, f"文件: {input_file}", force_translate)
+        # 翻译内容并保存；未传入翻译器时使用共用的默认翻译器
+        translator = translator or _get_default_translator()
+        saved_path = await translator.translate_html(html_content, f"文件: {input_file}")
 
-        return saved_path
+        return TranslationStatus.SUCCESS if saved_path else TranslationStatus.FAILED
 
     except Exception as e:
         logging.getLogger(__name__).error(f"翻译文件失败: {str(e)}")
-        return None
+        return TranslationStatus.FAILED
 
 
 
@@ -689,38 +985,48 @@ async def test_batch():
 
     print(f"📁 找到 {len(html_files)} 个HTML文件")
 
-    translator = HTMLTranslator()
-    success_count = 0
+    # 先筛掉已翻译的文件，跳过的文件不占用并发名额
+    to_translate = []
     skip_count = 0
-    error_count = 0
-
     for html_file in html_files:
-        try:
-            # 检查目标文件是否已存在
-            target_file = trans_dir / html_file.name
-            if target_file.exists():
-                print(f"⏭️  跳过已翻译文件: {html_file.name}")
-                skip_count += 1
-                continue
+        if (trans_dir / html_file.name).exists():
+            print(f"⏭️  跳过已翻译文件: {html_file.name}")
+            skip_count += 1
+        else:
+            to_translate.append(html_file)
+
+    # 所有文件共用一个翻译器（占位符和暂存属性按调用返回，可以安全地并发翻译）
+    translator = HTMLTranslator()
+    semaphore = asyncio.Semaphore(BATCH_SIZE)
 
+    async def _translate_one(html_file: Path) -> Optional[str]:
+        async with semaphore:
             print(f"\n🔄 开始翻译: {html_file.name}")
 
             # 读取HTML文件
-            with open(html_file, 'r', encoding='utf-8') as f:
-                html_content = f.read()
+            async with aiofiles.open(html_file, 'r', encoding='utf-8') as f:
+                html_content = await f.read()
 
             # 翻译HTML内容
-            saved_path = await translator.translate_html(html_content, f"文件: {html_file}")
+            return await translator.translate_html(html_content, f"文件: {html_file}")
 
-            if saved_path:
-                print(f"✅ 翻译成功: {html_file.name}")
-                success_count += 1
-            else:
-                print(f"❌ 翻译失败: {html_file.name}")
-                error_count += 1
+    # 并发翻译，使用信号量限制同时进行的API请求数量
+    results = await asyncio.gather(
+        *(_translate_one(html_file) for html_file in to_translate),
+        return_exceptions=True
+    )
 
-        except Exception as e:
-            print(f"❌ 处理文件 {html_file.name} 时出错: {str(e)}")
+    success_count = 0
+    error_count = 0
+    for html_file, result in zip(to_translate, results):
+        if isinstance(result, Exception):
+            print(f"❌ 处理文件 {html_file.name} 时出错: {str(result)}")
+            error_count += 1
+        elif result:
+            print(f"✅ 翻译成功: {html_file.name}")
+            success_count += 1
+        else:
+            print(f"❌ 翻译失败: {html_file.name}")
             error_count += 1
 
     # 打印统计结果
@@ -731,10 +1037,33 @@ async def test_batch():
     print(f"   📁 总文件数: {len(html_files)} 个文件")
 
 
+def test_chunk_split():
+    """测试长body切分：各片段拼接后应与原body完全一致，文本中的实体不能被还原"""
+    print("=== 测试body切分 ===")
+
+    # 被展开的容器下直接包含文本节点
+    text = "a &lt;b&gt; c &amp; d"
+    sections = text.join(f"<section>{f'<p>{text}</p>' * 400}</section>" for _ in range(8))
+    # 只有一个子元素的外层容器也应被展开
+    body = _parse_html(f"<html><body><div>{sections}</div><script>x</script></body></html>").body
+
+    chunks = HTMLTranslator._split_body_into_chunks(body, max_chunks=3)
+    joined = ''.join(html for html, _ in chunks)
+    translatable = len({label for _, label in chunks if label is not None})
+
+    if not 2 <= translatable <= 3:
+        print(f"❌ body切分块数不符: {translatable} 块")
+    elif joined != body.decode():
+        print("❌ 片段拼接结果与原body不一致")
+    elif '&lt;b&gt;' not in joined or '&amp;' not in joined:
+        print("❌ 文本中的实体被还原")
+    else:
+        print(f"✅ body切分为 {translatable} 块，拼接结果与原body一致")
+
+
 async def main():
     """主测试函数"""
     from config.logging_config import setup_logging
-    import sys
 
     # 设置日志
     setup_logging('INFO')
@@ -742,6 +1071,7 @@ async def main():
     print("HTML翻译工具")
     print("=" * 50)
 
+    test_chunk_split()
     await test_batch()
     # await test_translation()
 
@@ -750,5 +1080,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
@@ -0,0 +1,46 @@
+"""
+URL工具模块
+提供原文URL与本地文件名之间的转换
+
+创建时间：2024-12-19
+项目：系列技术文章翻译
+"""
+
+import functools
+import logging
+from urllib.parse import urlparse
+
+# 文章页面路径的公共前缀
+_BOOK_PATH_PREFIX = "scaling-book/"
+
+
+@functools.lru_cache(maxsize=None)
+def url_to_filename(url: str) -> str:
+    """
+    将URL转换为本地文件名
+
+    Args:
+        url (str): 原始URL
+
+    Returns:
+        str: 本地文件名
+    """
+    try:
+        path = urlparse(url).path.strip('/')
+
+        if not path or path == "scaling-book":
+            # 主页情况
+            return "scaling-book.html"
+
+        # 提取最后一个路径段作为文件名
+        if path.startswith(_BOOK_PATH_PREFIX):
+            page_name = path.replace(_BOOK_PATH_PREFIX, "")
+            if page_name:
+                return f"{page_name}.html"
+
+        # 如果路径不包含scaling-book，直接使用最后一段
+        return f"{path.split('/')[-1]}.html"
+
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"URL转文件名失败 {url}: {str(e)}")
+        return "unknown.html"